@@ -0,0 +1,17 @@
+import streamlit as st
+
+
+def about_page():
+    st.title("About Variantor")
+    st.write(""" 
+        Variantor is a tool that assists genetic counselors and researchers in exploring gene-related data.
+        - **Features**:
+          - Gene information retrieval
+          - Mutation analysis and interpretation
+          - Personalized genetic counseling using AI
+        - **Technologies Used**:
+          - Streamlit for web interface
+          - Groq API for AI-powered chatbot assistance
+          - Ensembl and MyGene APIs for gene and mutation data
+    """)
+    st.image("https://via.placeholder.com/500x300.png?text=Genetic+Data", caption="Gene Data Exploration")
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import requests
+from http_session import http_get, http_post
+from metrics import record
+
+
+DEFAULT_TTLS = {
+    "ensembl_lookup": 7 * 24 * 3600,
+    "mygene_query": 7 * 24 * 3600,
+    "ensembl_overlap": 24 * 3600,
+}
+
+
+class ApiCache:
+    """
+    SQLite-backed cache for upstream API responses, keyed by endpoint plus parameters.
+    Entries expire after a per-endpoint TTL and the least recently used entries are
+    evicted once the total stored size goes over max_bytes.
+    """
+
+    def __init__(self, path, ttls=None, max_bytes=256 * 1024 * 1024, offline=False):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(endpoint, params):
+        raw = json.dumps([endpoint, params], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, endpoint, params, allow_stale=None):
+        """
+        Return the cached text for endpoint/params, or None if missing or expired.
+        Expired entries are still served when allow_stale is set, which defaults to
+        the cache's offline setting.
+        """
+        if allow_stale is None:
+            allow_stale = self.offline
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            ttl = self.ttls.get(endpoint)
+            if row is None or (not allow_stale and ttl is not None and now - row[1] > ttl):
+                self.misses[endpoint] = self.misses.get(endpoint, 0) + 1
+                record(cache_misses=1)
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits[endpoint] = self.hits.get(endpoint, 0) + 1
+            record(cache_hits=1)
+            return row[0]
+
+    def set(self, endpoint, params, value):
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, endpoint, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, value, size, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": total,
+            "hits": sum(self.hits.values()),
+            "misses": sum(self.misses.values()),
+            "hits_per_endpoint": dict(self.hits),
+            "misses_per_endpoint": dict(self.misses),
+            "offline": self.offline,
+        }
+
+
+def _ttls_from_env():
+    ttls = {}
+    for endpoint in DEFAULT_TTLS:
+        value = os.getenv(f"VARIANTOR_CACHE_TTL_{endpoint.upper()}")
+        if value:
+            ttls[endpoint] = int(value)
+    return ttls
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the process-wide cache, creating it from the environment on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ApiCache(
+                os.getenv("VARIANTOR_CACHE_PATH", ".variantor_cache/api_cache.sqlite3"),
+                ttls=_ttls_from_env(),
+                max_bytes=int(os.getenv("VARIANTOR_CACHE_MAX_MB", "256")) * 1024 * 1024,
+                offline=os.getenv("VARIANTOR_OFFLINE", "").lower() in ("1", "true", "yes"),
+            )
+        return _cache
+
+
+def _is_offline(cache, offline):
+    # The cache's own flag (VARIANTOR_OFFLINE) is only the default; callers such as
+    # an app session pass their own setting instead of changing the shared cache.
+    return cache.offline if offline is None else offline
+
+
+def cached_get_json(endpoint, url, params=None, offline=None):
+    """
+    GET a JSON document through the cache. Returns the parsed JSON, or None when
+    the request fails or the entry is missing while running in offline mode.
+    """
+    cache = get_cache()
+    offline = _is_offline(cache, offline)
+    key_params = {"url": url, "params": params}
+    cached = cache.get(endpoint, key_params, allow_stale=offline)
+    if cached is not None:
+        return json.loads(cached)
+
+    if offline:
+        print(f"Offline mode: no cached response for {url}")
+        return None
+
+    try:
+        response = http_get(url, params=params)
+    except requests.RequestException as e:
+        print(f"Error fetching {url}: {e}")
+        return None
+    if response.status_code != 200:
+        print(f"Error fetching {url}, status code: {response.status_code}")
+        return None
+
+    cache.set(endpoint, key_params, response.text)
+    return response.json()
+
+
+def post_json(url, json_body=None, data=None):
+    """
+    POST to a JSON endpoint. Returns the parsed JSON, or None when the request fails.
+    """
+    headers = {"Accept": "application/json"}
+    try:
+        response = http_post(url, json=json_body, data=data, headers=headers)
+    except requests.RequestException as e:
+        print(f"Error posting to {url}: {e}")
+        return None
+    if response.status_code != 200:
+        print(f"Error posting to {url}, status code: {response.status_code}")
+        return None
+    return response.json()
+
+
+def cached_bulk_json(endpoint, keys, fetch_batch, batch_size=1000, offline=None):
+    """
+    Resolve many keys through the cache, fetching only the missing ones in batches.
+    fetch_batch(batch) must return a dict of key -> JSON result, or None on failure.
+    Keys that could not be resolved are left out of the returned dict.
+    """
+    cache = get_cache()
+    offline = _is_offline(cache, offline)
+    results = {}
+    missing = []
+    for key in keys:
+        cached = cache.get(endpoint, {"key": key}, allow_stale=offline)
+        if cached is not None:
+            results[key] = json.loads(cached)
+        else:
+            missing.append(key)
+
+    if missing and offline:
+        print(f"Offline mode: no cached {endpoint} response for {', '.join(missing)}")
+        return results
+
+    for i in range(0, len(missing), batch_size):
+        fetched = fetch_batch(missing[i:i + batch_size])
+        if fetched is None:
+            continue
+        for key, value in fetched.items():
+            cache.set(endpoint, {"key": key}, json.dumps(value))
+            results[key] = value
+    return results
@@ -0,0 +1,197 @@
+import os
+import re
+import csv
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+from pipeline import failed_genes, fetch_genes_data, parse_gene_panel
+from chat_context import ContextBuilder
+from llm_client import get_client, stream_chat_response
+from report import write_report, generate_report_parallel
+
+
+PROGRESS_FILE = "progress.jsonl"
+SUMMARY_FILE = "summary.json"
+DEFAULT_QUESTION = "Interpret these variants for a genetic counseling session and highlight the clinically relevant findings."
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return parse_gene_panel(str(value))
+
+
+def load_cases(path, consequences, mutation_limit):
+    """
+    Read cases from a JSONL file ({"case_id", "genes", "consequences", "mutation_limit"}),
+    a CSV file with the same columns (lists separated by spaces or semicolons), or a
+    plain gene list, which becomes a single case. Missing fields fall back to the
+    command-line defaults.
+    """
+    name = path.lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if name.endswith((".jsonl", ".json")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        elif name.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [{"case_id": os.path.splitext(os.path.basename(path))[0], "genes": f.read()}]
+
+    cases = []
+    for number, row in enumerate(rows, start=1):
+        cases.append({
+            "case_id": str(row.get("case_id") or f"case_{number}"),
+            "genes": _as_list(row.get("genes")),
+            "consequences": _as_list(row.get("consequences")) or consequences,
+            "mutation_limit": int(row.get("mutation_limit") or mutation_limit),
+        })
+    return cases
+
+
+def load_progress(output_dir):
+    """
+    Return the last recorded result for every case in the progress file.
+    """
+    results = {}
+    path = os.path.join(output_dir, PROGRESS_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by a crash
+                results[record["case_id"]] = record
+    return results
+
+
+class ProgressLog:
+    """
+    Append-only record of finished cases, flushed to disk after every case so an
+    interrupted batch can be resumed.
+    """
+
+    def __init__(self, output_dir):
+        self._file = open(os.path.join(output_dir, PROGRESS_FILE), "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def run_case(case, output_dir, client=None, question=DEFAULT_QUESTION, report_workers=0):
+    """
+    Run fetch, filter, optional LLM interpretation and PDF rendering for one case.
+    The case is "ok" only if every gene resolved and its variants were fetched,
+    "partial" if some did, and "error" if none did; only "ok" cases are skipped
+    on resume.
+    """
+    started = time.perf_counter()
+    genes_data, missing_genes = fetch_genes_data(case["genes"], case["mutation_limit"], case["consequences"])
+    failed = failed_genes(genes_data, missing_genes)
+    if not failed:
+        status = "ok"
+    elif len(failed) < len(case["genes"]):
+        status = "partial"
+    else:
+        status = "error"
+
+    interpretation = None
+    if client is not None and genes_data:
+        builder = ContextBuilder()
+        builder.set_genes(genes_data)
+        interpretation = "".join(stream_chat_response(client, question, builder.build()))
+
+    report_path = None
+    if genes_data:
+        report_path = os.path.join(output_dir, re.sub(r"[^\w.-]", "_", case["case_id"]) + ".pdf")
+        if report_workers > 1:
+            generate_report_parallel(genes_data, output=report_path, workers=report_workers)
+        else:
+            write_report(genes_data, report_path)
+
+    return {
+        "case_id": case["case_id"],
+        "status": status,
+        "genes": case["genes"],
+        "missing_genes": missing_genes,
+        "failed_genes": failed,
+        "variants": sum(len(mutations) for _, _, mutations in genes_data if not isinstance(mutations, str)),
+        "report": report_path,
+        "interpretation": interpretation,
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+def run_batch(cases, output_dir, workers=4, client=None, question=DEFAULT_QUESTION, report_workers=0):
+    """
+    Run every case that has not already finished successfully, `workers` cases at a
+    time, then write the summary of all cases. Returns the summary records.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    done = {case_id for case_id, record in load_progress(output_dir).items() if record.get("status") == "ok"}
+    pending = [case for case in cases if case["case_id"] not in done]
+    print(f"{len(cases)} case(s), {len(cases) - len(pending)} already done, {len(pending)} to run")
+
+    log = ProgressLog(output_dir)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(run_case, case, output_dir, client, question, report_workers): case
+                for case in pending
+            }
+            for number, future in enumerate(as_completed(futures), start=1):
+                case = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = {"case_id": case["case_id"], "status": "error", "genes": case["genes"], "error": str(e)}
+                log.write(record)
+                print(f"[{number}/{len(pending)}] {record['case_id']}: {record['status']}")
+    finally:
+        log.close()
+
+    results = load_progress(output_dir)
+    summary = [results[case["case_id"]] for case in cases if case["case_id"] in results]
+    with open(os.path.join(output_dir, SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Variantor pipeline headlessly over a batch of cases.")
+    parser.add_argument("cases", help="JSONL or CSV file of cases, or a plain gene list for a single case")
+    parser.add_argument("output_dir", help="Directory for the PDF reports, progress log and summary.json")
+    parser.add_argument("--consequence", action="append", help="Default consequence filter (repeatable)")
+    parser.add_argument("--mutation-limit", type=int, default=5, help="Default number of mutations per consequence")
+    parser.add_argument("--workers", type=int, default=4, help="Number of cases processed concurrently")
+    parser.add_argument("--report-workers", type=int, default=0, help="Processes used to render each report")
+    parser.add_argument("--interpret", action="store_true", help="Add an LLM interpretation to each case")
+    parser.add_argument("--question", default=DEFAULT_QUESTION, help="Question asked for the LLM interpretation")
+    args = parser.parse_args(argv)
+
+    client = None
+    if args.interpret:
+        load_dotenv()
+        client = get_client()
+
+    cases = load_cases(args.cases, args.consequence or ["stop_gained"], args.mutation_limit)
+    summary = run_batch(cases, args.output_dir, args.workers, client, args.question, args.report_workers)
+    statuses = [record.get("status") for record in summary]
+    ok, partial = statuses.count("ok"), statuses.count("partial")
+    print(f"Finished: {ok} ok, {partial} partial, {len(summary) - ok - partial} failed. Summary written to {os.path.join(args.output_dir, SUMMARY_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
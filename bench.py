@@ -0,0 +1,454 @@
+import os
+import io
+import sys
+import json
+import gzip
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from types import SimpleNamespace
+from contextlib import redirect_stdout
+
+BENCH_DIR = os.getenv("VARIANTOR_BENCH_DIR", ".variantor_bench")
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# Replay everything from a private offline cache; nothing may reach the network.
+os.environ["VARIANTOR_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="variantor_bench_"), "replay.sqlite3")
+os.environ["VARIANTOR_CACHE_MAX_MB"] = "1024"
+os.environ["VARIANTOR_OFFLINE"] = "1"
+os.environ["VARIANTOR_METRICS_LOG"] = "off"
+os.environ.pop("VARIANTOR_METRICS_FILE", None)
+os.environ.pop("VARIANTOR_VARIANT_INDEX", None)
+
+import pipeline
+from api_cache import get_cache
+from shared_store import shared_store
+from chat_context import ContextBuilder
+from retrieval import ContextRetriever
+from llm_client import ResponseCache, stream_chat_response
+from report import wrap_text, generate_report, write_report, PAGE_WIDTH, X_OFFSET
+from document_ingest import MentionIndex, scan_document
+from variant_catalogue import VariantCatalogue, iter_windows
+
+
+# Real coordinates (GRCh38) with variant counts in the range the overlap endpoint returns.
+GENES = {
+    "TP53": {"id": "ENSG00000141510", "chromosome": "17", "start": 7661779, "end": 7687538, "variants": 8000},
+    "BRCA1": {"id": "ENSG00000012048", "chromosome": "17", "start": 43044295, "end": 43125483, "variants": 25000},
+    "BRCA2": {"id": "ENSG00000139618", "chromosome": "13", "start": 32315508, "end": 32400268, "variants": 30000},
+    "TTN": {"id": "ENSG00000155657", "chromosome": "2", "start": 178525989, "end": 178830802, "variants": 120000},
+}
+CONSEQUENCE_WEIGHTS = {
+    "intron_variant": 0.55, "upstream_gene_variant": 0.08, "downstream_gene_variant": 0.07,
+    "missense_variant": 0.06, "3_prime_UTR_variant": 0.05, "non_coding_transcript_exon_variant": 0.05,
+    "synonymous_variant": 0.04, "5_prime_UTR_variant": 0.02, "splice_region_variant": 0.02,
+    "frameshift_variant": 0.01, "stop_gained": 0.004, "splice_donor_variant": 0.003,
+    "splice_acceptor_variant": 0.003, "inframe_deletion": 0.002, "start_lost": 0.001,
+}
+# No fixture variant has the first term, so that filter scans the whole gene.
+FULL_SCAN_FILTERS = ["transcript_ablation"]
+RARE_FILTERS = ["stop_gained"]
+COMMON_FILTERS = ["missense_variant", "intron_variant"]
+REPORT_SIZES = (10, 1000, 10000)
+DOCUMENT_VARIANTS = 1500  # about 190 pages, the size of a long lab report
+QUESTION = "Which of these variants are likely pathogenic and what follow-up testing is recommended?"
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+PAGES = ("Landing Page", "Gene Analysis", "Variant Catalogue", "About")
+# Fresh interpreter per run: time until the selected page has rendered once.
+COLD_START_SCRIPT = """
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({app!r}, default_timeout=120)
+app.run()
+if {page!r} != "Landing Page":
+    app.sidebar.selectbox[0].select({page!r}).run()
+if app.exception:
+    raise SystemExit(str(app.exception))
+"""
+SUMMARY = ("This gene encodes a protein that regulates the cell cycle and maintains genomic stability. "
+           "Mutations in this gene are associated with inherited cancer predisposition syndromes. ")
+
+
+def fixture_path(fixture_dir, gene):
+    return os.path.join(fixture_dir, f"{gene}.json.gz")
+
+
+def load_fixture(fixture_dir, name):
+    with gzip.open(os.path.join(fixture_dir, f"{name}.json.gz"), "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_fixture(fixture_dir, name, data):
+    os.makedirs(fixture_dir, exist_ok=True)
+    with gzip.open(os.path.join(fixture_dir, f"{name}.json.gz"), "wt", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def synthesize_fixture(gene):
+    """
+    Deterministic stand-in for a recorded response, shaped like the Ensembl and
+    MyGene payloads, used when no recording of the gene exists.
+    """
+    spec = GENES[gene]
+    rng = random.Random(gene)
+    terms, weights = zip(*CONSEQUENCE_WEIGHTS.items())
+    positions = sorted(rng.randint(spec["start"], spec["end"]) for _ in range(spec["variants"]))
+    overlap = [
+        {
+            "id": f"rs{rng.randint(1, 10 ** 9)}",
+            "seq_region_name": spec["chromosome"],
+            "start": position,
+            "end": position,
+            "strand": 1,
+            "alleles": rng.sample(["A", "C", "G", "T"], 2),
+            "consequence_type": rng.choices(terms, weights)[0],
+            "feature_type": "variation",
+            "source": "dbSNP",
+            "clinical_significance": [],
+        }
+        for position in positions
+    ]
+    return {
+        "lookup": {"display_name": gene, "id": spec["id"], "seq_region_name": spec["chromosome"],
+                   "start": spec["start"], "end": spec["end"]},
+        "mygene": {"query": gene, "symbol": gene, "name": f"{gene} gene", "summary": SUMMARY * 3},
+        "overlap": overlap,
+    }
+
+
+def synthesize_chat():
+    words = ("Based on the variants provided, the stop gained and frameshift variants are the most likely to be "
+             "pathogenic because they truncate the protein. Confirmatory testing and cascade testing of relatives "
+             "should be discussed. ") * 8
+    return {"chunks": [word + " " for word in words.split()]}
+
+
+def ensure_fixtures(fixture_dir):
+    """
+    Synthesize a fixture for every gene that has no recording yet.
+    """
+    for gene in GENES:
+        if not os.path.exists(fixture_path(fixture_dir, gene)):
+            print(f"No recording for {gene}, synthesizing {GENES[gene]['variants']} variants")
+            save_fixture(fixture_dir, gene, synthesize_fixture(gene))
+    if not os.path.exists(os.path.join(fixture_dir, "groq.json.gz")):
+        save_fixture(fixture_dir, "groq", synthesize_chat())
+
+
+def record_fixtures(genes, fixture_dir, record_groq=False):
+    """
+    Record live Ensembl, MyGene (and optionally Groq) responses as fixtures.
+    Needs network access; the benchmarks themselves never do.
+    """
+    from http_session import http_get
+    from api_cache import post_json
+
+    lookups = post_json("https://rest.ensembl.org/lookup/symbol/homo_sapiens", json_body={"symbols": genes}) or {}
+    hits = post_json("https://mygene.info/v3/query", data={
+        "q": ",".join(genes), "scopes": "symbol", "fields": "symbol,name,summary", "species": "human"
+    }) or []
+    functions = {hit["query"]: hit for hit in hits if not hit.get("notfound")}
+
+    for gene in genes:
+        lookup = lookups.get(gene)
+        if not lookup:
+            print(f"Skipping {gene}: not found in Ensembl")
+            continue
+        response = http_get(overlap_url(lookup["id"]))
+        if response.status_code != 200:
+            print(f"Skipping {gene}: overlap query returned {response.status_code}")
+            continue
+        overlap = response.json()
+        save_fixture(fixture_dir, gene, {"lookup": lookup, "mygene": functions.get(gene), "overlap": overlap})
+        print(f"Recorded {gene}: {len(overlap)} variants")
+
+    if record_groq:
+        from groq import Groq
+        from dotenv import load_dotenv
+        load_dotenv()
+        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        builder = ContextBuilder()
+        builder.set_genes([_gene_data(load_fixture(fixture_dir, gene), 50) for gene in genes
+                           if os.path.exists(fixture_path(fixture_dir, gene))])
+        chunks = list(stream_chat_response(client, QUESTION, builder.build(), cache=ResponseCache()))
+        save_fixture(fixture_dir, "groq", {"chunks": chunks})
+        print(f"Recorded Groq answer: {len(chunks)} chunks")
+
+
+def overlap_url(gene_id):
+    return f"https://rest.ensembl.org/overlap/id/{gene_id}?feature=variation;content-type=application/json"
+
+
+def load_replay_cache(fixtures):
+    cache = get_cache()
+    for gene, fixture in fixtures.items():
+        cache.set("ensembl_lookup", {"key": gene}, json.dumps(fixture["lookup"]))
+        if fixture.get("mygene"):
+            cache.set("mygene_query", {"key": gene}, json.dumps(fixture["mygene"]))
+        cache.set("ensembl_overlap", {"url": overlap_url(fixture["lookup"]["id"]), "params": None},
+                  json.dumps(fixture["overlap"]))
+
+
+class ReplayGroq:
+    """
+    Groq client stand-in that streams a recorded answer back without delay.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, messages, model, stream=True):
+        for chunk in self.chunks:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))])
+
+
+def _mutation(record):
+    consequence = record["consequence_type"]
+    return {
+        "Variation": record["id"],
+        "Location": f"{record['seq_region_name']}:{record['start']}-{record['end']}",
+        "Allele": "/".join(record["alleles"]),
+        "Consequence": consequence if isinstance(consequence, str) else "/".join(consequence),
+    }
+
+
+def _gene_data(fixture, variants):
+    lookup = fixture["lookup"]
+    gene_info = {
+        "Gene Name": lookup["display_name"], "Gene Symbol": lookup["display_name"], "Gene ID": lookup["id"],
+        "Chromosome": lookup["seq_region_name"], "Start": lookup["start"], "End": lookup["end"],
+    }
+    mygene = fixture.get("mygene") or {}
+    gene_function = {"symbol": mygene.get("symbol", "N/A"), "name": mygene.get("name", "N/A"),
+                     "summary": mygene.get("summary", "No function available")}
+    return gene_info, gene_function, [_mutation(record) for record in fixture["overlap"][:variants]]
+
+
+def build_catalogue(gene, fixture, region_size=100000):
+    """
+    Build a catalogue from a fixture the way load_catalogue does, one window at a time.
+    """
+    lookup, records = fixture["lookup"], fixture["overlap"]
+    catalogue = VariantCatalogue(gene, lookup["seq_region_name"], lookup["start"], lookup["end"])
+    position = 0
+    for window_start, window_end in iter_windows(lookup["start"], lookup["end"], region_size):
+        window = position
+        while position < len(records) and records[position]["start"] <= window_end:
+            position += 1
+        catalogue.add_window(window_start, records[window:position])
+    return catalogue.finish()
+
+
+def measure(fn, repeat, warmup=1):
+    with redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+    }
+
+
+def build_benchmarks(fixtures, chat):
+    """
+    Return (name, callable) pairs; each callable runs one measured operation.
+    """
+    benchmarks = []
+    client = ReplayGroq(chat["chunks"])
+
+    for gene, fixture in fixtures.items():
+        gene_info = _gene_data(fixture, 0)[0]
+        for label, filters in (("full_scan", FULL_SCAN_FILTERS), ("rare", RARE_FILTERS), ("common", COMMON_FILTERS)):
+            def filter_loop(gene=gene, gene_info=gene_info, filters=filters, records=fixture["overlap"]):
+                original = pipeline.cached_get_json
+                pipeline.cached_get_json = lambda endpoint, url, **kwargs: records
+                try:
+                    pipeline.get_filtered_mutation_data_ensembl(gene, 5, filters, gene_info=gene_info, stream=False)
+                finally:
+                    pipeline.cached_get_json = original
+            benchmarks.append((f"filter_loop/{gene}/{label}", filter_loop))
+
+    long_text = " ".join(fixture["mygene"]["summary"] for fixture in fixtures.values() if fixture.get("mygene")) * 20
+    benchmarks.append(("wrap_text/long_paragraph", lambda: wrap_text(long_text, PAGE_WIDTH, 10, x_offset=X_OFFSET)))
+
+    largest = max(fixtures.values(), key=lambda fixture: len(fixture["overlap"]))
+    for size in REPORT_SIZES:
+        genes_data = [_gene_data(largest, size)]
+        benchmarks.append((f"generate_report/{size}_variants", lambda genes_data=genes_data: generate_report(genes_data)))
+
+    panel = [_gene_data(fixture, 2500) for fixture in fixtures.values()]
+
+    def context_build():
+        builder = ContextBuilder()
+        builder.set_genes(panel)
+        builder.build()
+
+    def context_retrieval():
+        retriever = ContextRetriever()
+        retriever.set_genes(panel)
+        retriever.context_for(QUESTION)
+
+    document = io.BytesIO()
+    write_report([_gene_data(largest, DOCUMENT_VARIANTS)], document)
+    document = document.getvalue()
+    index = MentionIndex(list(fixtures))
+    for label, workers in (("serial", 1), ("parallel", 0)):
+        benchmarks.append((f"document_scan/{DOCUMENT_VARIANTS}_variant_pdf/{label}",
+                           lambda workers=workers: scan_document(document, "report.pdf", index, workers)))
+
+    largest_gene = max(fixtures, key=lambda gene: len(fixtures[gene]["overlap"]))
+    catalogue = build_catalogue(largest_gene, fixtures[largest_gene])
+    every_row = catalogue.select()
+    benchmarks.append((f"catalogue/{largest_gene}/build",
+                       lambda: build_catalogue(largest_gene, fixtures[largest_gene])))
+    benchmarks.append((f"catalogue/{largest_gene}/page", lambda: catalogue.page(every_row, len(every_row) // 200, 100)))
+    for export_format in ("csv", "parquet"):
+        benchmarks.append((f"catalogue/{largest_gene}/export_{export_format}",
+                           lambda export_format=export_format: sum(map(len, catalogue.iter_export(every_row, export_format)))))
+
+    benchmarks.append(("context/build", context_build))
+    benchmarks.append(("context/retrieval", context_retrieval))
+
+    for gene in fixtures:
+        for label, stream in (("buffered", False), ("stream", True)):
+            def end_to_end(gene=gene, stream=stream):
+                # Start from an empty shared store, or every run after the first only times a store hit.
+                shared_store.clear()
+                genes_data, _ = pipeline.fetch_genes_data([gene], 5, RARE_FILTERS + COMMON_FILTERS, stream=stream)
+                builder = ContextBuilder()
+                builder.set_genes(genes_data)
+                "".join(stream_chat_response(client, QUESTION, builder.build(), cache=ResponseCache()))
+                generate_report(genes_data)
+            benchmarks.append((f"end_to_end/{gene}/{label}", end_to_end))
+
+    for page in PAGES:
+        def cold_start(page=page):
+            subprocess.run([sys.executable, "-c", COLD_START_SCRIPT.format(app=APP_PATH, page=page)],
+                           check=True, capture_output=True)
+        benchmarks.append((f"cold_start/{page.lower().replace(' ', '_')}", cold_start))
+
+    return benchmarks
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(fixture_dir, repeat, only=None):
+    ensure_fixtures(fixture_dir)
+    names = sorted(name[:-len(".json.gz")] for name in os.listdir(fixture_dir) if name.endswith(".json.gz"))
+    fixtures = {gene: load_fixture(fixture_dir, gene) for gene in names if gene != "groq"}
+    load_replay_cache(fixtures)
+    chat = load_fixture(fixture_dir, "groq")
+
+    results = {}
+    for name, fn in build_benchmarks(fixtures, chat):
+        if only and not any(pattern in name for pattern in only):
+            continue
+        results[name] = measure(fn, repeat)
+        print(f"{name:<40} median {results[name]['median_ms']:>10.3f} ms   p95 {results[name]['p95_ms']:>10.3f} ms")
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fixtures": {gene: len(fixture["overlap"]) for gene, fixture in fixtures.items()},
+        "benchmarks": results,
+    }
+
+
+def compare(baseline, current, threshold=0.10, noise_ms=0.25):
+    """
+    Compare median timings; a benchmark regresses when it is more than threshold
+    slower and the difference is above noise_ms. Returns the names that regressed.
+    """
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, stats in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            print(f"{name:<40} {'-':>12} {stats['median_ms']:>10.3f}ms {'new':>9}")
+            continue
+        change = stats["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0.0
+        flag = ""
+        if change > threshold and stats["median_ms"] - base["median_ms"] > noise_ms:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<40} {base['median_ms']:>10.3f}ms {stats['median_ms']:>10.3f}ms {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline Variantor benchmarks replayed from recorded fixtures.")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="Fixture directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the benchmarks and save the results")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    run_parser.add_argument("--only", action="append", help="Only run benchmarks whose name contains this (repeatable)")
+    run_parser.add_argument("--output", help="Results file (default: a timestamped file in the results directory)")
+    run_parser.add_argument("--baseline", help="Results file to compare against; exits 1 on regressions")
+    run_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before flagging")
+
+    compare_parser = sub.add_parser("compare", help="Compare two results files; exits 1 on regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before flagging")
+
+    record_parser = sub.add_parser("record", help="Record live API responses as fixtures (needs network)")
+    record_parser.add_argument("genes", nargs="+")
+    record_parser.add_argument("--groq", action="store_true", help="Also record a Groq answer (needs GROQ_API_KEY)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        record_fixtures(args.genes, args.fixtures, args.groq)
+        return 0
+
+    if args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+    else:
+        results = run(args.fixtures, args.repeat, args.only)
+        output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {output}")
+        regressions = []
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                regressions = compare(json.load(f), results, args.threshold)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import streamlit as st
+from api_cache import get_cache
+from variant_catalogue import (EXPORT_FORMATS, EXPORT_INLINE_MAX_ROWS, EXPORT_PORT, export_url, get_catalogue,
+                               register_export, serve_exports)
+
+
+PAGE_SIZES = [50, 100, 250, 500]
+
+
+def catalogue_table(catalogue):
+    term_counts = catalogue.count_by_term()
+    consequences = st.multiselect("Only show variants with these consequences", list(term_counts),
+                                  format_func=lambda term: f"{term} ({term_counts[term]:,})")
+    rows = catalogue.select(consequences)
+
+    left, right = st.columns(2)
+    page_size = left.selectbox("Rows per page", PAGE_SIZES, index=1)
+    pages = max(1, -(-len(rows) // page_size))
+    page = right.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, step=1,
+                              key=f"catalogue_page_{len(rows)}_{page_size}")
+
+    # Only the rows of the current page are decoded and sent to the browser.
+    first = (page - 1) * page_size
+    st.dataframe(catalogue.page(rows, page - 1, page_size), hide_index=True)
+    st.caption(f"Rows {min(first + 1, len(rows)):,}-{min(first + page_size, len(rows)):,} of {len(rows):,}")
+
+    st.subheader("Export")
+    export_format = st.radio("Format", EXPORT_FORMATS, horizontal=True)
+    file_name = f"{catalogue.gene}_variants.{export_format}"
+    label = f"Download {len(rows):,} variants as {export_format.upper()}"
+    if EXPORT_PORT:
+        path = st.session_state.get("catalogue_export")
+        key = (catalogue.gene, tuple(consequences), export_format)
+        if path is None or path[0] != key:
+            path = st.session_state.catalogue_export = (key, register_export(catalogue, rows, export_format))
+        st.link_button(label, export_url(path[1]))
+    elif len(rows) <= EXPORT_INLINE_MAX_ROWS:
+        # st.download_button serves the whole file from memory, so it is only offered
+        # for small selections; the data is generated when the button is clicked.
+        st.download_button(label, lambda: b"".join(catalogue.iter_export(rows, export_format)), file_name=file_name)
+    else:
+        command = " ".join(["python variant_catalogue.py", catalogue.gene, file_name]
+                           + [f"--consequence {consequence}" for consequence in consequences])
+        st.info(f"{len(rows):,} variants are too many to download through the app without holding the whole file "
+                f"in memory (the limit is {EXPORT_INLINE_MAX_ROWS:,}). Select fewer consequences, set "
+                "VARIANTOR_EXPORT_PORT to stream exports from the app, or export from the command line:")
+        st.code(command, language="bash")
+
+
+def catalogue_page():
+    st.title("Variant Catalogue")
+    st.write("Browse and export every known variant overlapping a gene, not just the first few per consequence.")
+
+    serve_exports()
+    offline = st.session_state.offline = st.sidebar.checkbox("Offline mode (serve from cache only)",
+                                                             value=st.session_state.get("offline", get_cache().offline))
+
+    with st.form("catalogue_form"):
+        gene = st.text_input("Gene symbol", value=st.session_state.get("catalogue_gene", ""))
+        submitted = st.form_submit_button("Load catalogue")
+    if submitted and gene.strip():
+        st.session_state.catalogue_gene = gene.strip().upper()
+
+    gene = st.session_state.get("catalogue_gene")
+    if not gene:
+        st.write("Enter a gene symbol and submit to load its variants.")
+        return
+
+    progress = st.progress(0.0, text=f"Fetching variants for {gene}...")
+    catalogue = get_catalogue(
+        gene, offline=offline,
+        progress=lambda done, total: progress.progress(done / total, text=f"Fetched {done} of {total} region(s)"),
+    )
+    progress.empty()
+
+    if catalogue is None:
+        st.error(f"Gene information not found for {gene}.")
+        return
+    if not catalogue.complete:
+        # Incomplete catalogues are not kept; the windows that did load are in the
+        # API cache, so the next attempt only goes upstream for the missing ones.
+        st.warning(f"{len(catalogue.missing_windows)} of {catalogue.windows} region(s) could not be fetched; "
+                   "the catalogue is incomplete. Submit again to retry.")
+
+    st.caption(f"{catalogue.gene}: chromosome {catalogue.chromosome}:{catalogue.start:,}-{catalogue.end:,}, "
+               f"{len(catalogue):,} variants in {catalogue.nbytes / 1e6:.1f} MB")
+    catalogue_table(catalogue)
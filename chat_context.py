@@ -0,0 +1,157 @@
+import os
+import re
+import json
+import hashlib
+from variant_table import SO_TERMS
+from metrics import span
+
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("VARIANTOR_CONTEXT_TOKEN_BUDGET", "6000"))
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SEVERITY = {term: rank for rank, term in enumerate(SO_TERMS)}
+
+
+def count_tokens(text):
+    """
+    Local token estimate: one token per punctuation mark and per four characters of
+    each word. Close enough to the llama3 tokenizer to keep prompts inside the
+    context window without calling out to a tokenizer service.
+    """
+    return sum((len(piece) + 3) // 4 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def variant_rank(mutation):
+    """
+    Most severe consequence first, using the SO term order (highest impact first).
+    """
+    consequences = str(mutation.get("Consequence", "")).split("/")
+    return min((_SEVERITY.get(term, len(SO_TERMS)) for term in consequences), default=len(SO_TERMS))
+
+
+class GeneSection:
+    """
+    Pre-serialized context lines for one gene, with token counts computed once.
+    """
+
+    def __init__(self, gene_info, gene_function, mutations):
+        symbol = gene_info.get("Gene Symbol", "N/A") if gene_info else "N/A"
+        self.symbol = symbol
+
+        if gene_info:
+            header = (f"## {symbol} ({gene_info.get('Gene ID', 'N/A')}, chr{gene_info.get('Chromosome', 'N/A')}:"
+                      f"{gene_info.get('Start', 'N/A')}-{gene_info.get('End', 'N/A')})")
+        else:
+            header = f"## {symbol} (no gene information)"
+        if gene_function and gene_function.get("name") not in (None, "N/A"):
+            header += f"\nName: {gene_function['name']}"
+        self.header = header
+        self.header_tokens = count_tokens(header)
+
+        summary = gene_function.get("summary") if gene_function else None
+        self.summary = f"Function: {summary}" if summary else ""
+        self.summary_tokens = count_tokens(self.summary)
+
+        self.note = ""
+        self.variants = []
+        if isinstance(mutations, str) or not mutations:
+            self.note = f"Variants: {mutations if mutations else 'None'}"
+        else:
+            for position, mutation in enumerate(mutations):
+                line = f"{mutation['Variation']} {mutation['Allele']} {mutation['Consequence']}"
+                self.variants.append((variant_rank(mutation), position, line, count_tokens(line) + 1))
+        self.note_tokens = count_tokens(self.note)
+        if self.variants:
+            count = len(self.variants)
+            self.note_tokens += count_tokens(f"Variants ({count} of {count}):")
+
+
+def gene_key(gene_data):
+    raw = json.dumps([gene_data[0], gene_data[1], gene_data[2] if isinstance(gene_data[2], str) else list(gene_data[2] or [])],
+                     sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ContextBuilder:
+    """
+    Builds the chatbot context from genes_data as compact per-gene sections. Gene
+    headers always go in, then function summaries, then variants ranked by
+    severity across all genes until the token budget is used up. Sections are
+    cached per gene, so a new gene set only serializes the genes it adds.
+    """
+
+    def __init__(self, token_budget=CONTEXT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self._sections = {}
+        self._order = []
+        self.report = {}
+
+    def set_genes(self, genes_data):
+        keys = []
+        for gene_data in genes_data:
+            key = gene_key(gene_data)
+            if key not in self._sections:
+                self._sections[key] = GeneSection(*gene_data)
+            keys.append(key)
+        self._order = keys
+        for key in list(self._sections):
+            if key not in keys:
+                del self._sections[key]
+
+    def build(self):
+        with span("context_build", genes=len(self._order)) as stage:
+            text = self._build()
+            stage.add(items=self.report["variants_kept"], bytes=len(text.encode("utf-8")))
+        return text
+
+    def _build(self):
+        sections = [self._sections[key] for key in self._order]
+        legend = "Variants are listed as: id alleles consequences."
+        used = count_tokens(legend) + sum(section.header_tokens + section.note_tokens for section in sections)
+
+        include_summary = []
+        dropped_summaries = 0
+        for section in sections:
+            fits = bool(section.summary) and used + section.summary_tokens <= self.token_budget
+            include_summary.append(fits)
+            if fits:
+                used += section.summary_tokens
+            elif section.summary:
+                dropped_summaries += 1
+
+        candidates = sorted(
+            (rank, gene, position, line, tokens)
+            for gene, section in enumerate(sections)
+            for rank, position, line, tokens in section.variants
+        )
+        kept = [[] for _ in sections]
+        total_variants = len(candidates)
+        for rank, gene, position, line, tokens in candidates:
+            if used + tokens > self.token_budget:
+                continue
+            used += tokens
+            kept[gene].append((position, line))
+
+        blocks = [legend]
+        for section, summary, variants in zip(sections, include_summary, kept):
+            lines = [section.header]
+            if summary:
+                lines.append(section.summary)
+            if section.note:
+                lines.append(section.note)
+            if section.variants:
+                lines.append(f"Variants ({len(variants)} of {len(section.variants)}):")
+                lines.extend(line for _, line in sorted(variants))
+            blocks.append("\n".join(lines))
+
+        text = "\n\n".join(blocks)
+        kept_variants = sum(len(variants) for variants in kept)
+        self.report = {
+            "tokens": used,
+            "budget": self.token_budget,
+            "genes": len(sections),
+            "variants_kept": kept_variants,
+            "variants_dropped": total_variants - kept_variants,
+            "summaries_dropped": dropped_summaries,
+        }
+        return text
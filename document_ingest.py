@@ -0,0 +1,346 @@
+import os
+import re
+import csv
+import time
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+import requests
+from metrics import span
+
+
+INGEST_WORKERS = int(os.getenv("VARIANTOR_INGEST_WORKERS", "0"))
+HGNC_SYMBOLS = os.getenv("VARIANTOR_HGNC_SYMBOLS", "")
+HGNC_URL = os.getenv(
+    "VARIANTOR_HGNC_URL", "https://storage.googleapis.com/public-download-files/hgnc/tsv/tsv/hgnc_complete_set.txt"
+)
+HGNC_FILE_NAME = "hgnc_complete_set.txt"
+PAGES_PER_TASK = 8
+MIN_PARALLEL_PAGES = 16
+DOCX_PARAGRAPHS_PER_PAGE = 50
+
+# One compiled pattern, so each page is scanned once however many symbols are known:
+# gene candidates are looked up in a hash set instead of getting a regex each.
+_MENTION_PATTERN = re.compile(
+    r"(?P<hgvs>\b(?:N[MRPCG]|X[MR])_\d+(?:\.\d+)?(?:\((?P<hgvs_gene>[A-Za-z0-9-]+)\))?:[cgnmrp]\.[^\s,;]+)"
+    r"|(?P<short_hgvs>(?<![\w.])[cgp]\.(?:\([0-9A-Za-z*_>+\-]+\)|[0-9A-Z*][0-9A-Za-z*_>+\-]*))"
+    r"|(?P<rsid>\brs\d+\b)"
+    r"|(?P<gene>\b[A-Z][A-Z0-9]{1,9}(?:-[A-Z0-9]+)?\b)"
+)
+
+# Without an HGNC symbol list upper-case tokens are only shown as unverified
+# suggestions; these are the usual non-gene ones in lab reports.
+_STOPWORDS = frozenset("""
+    AND ARE BUT FOR NOT THE WAS WITH FROM THIS THAT HAS HAVE YES DNA RNA MRNA PCR NGS GENE GENES
+    TEST TESTING NEGATIVE POSITIVE REPORT PATIENT NAME DATE DOB MRN VUS ACMG AMP HGVS CLIA CAP LLC
+    INC PHD FAX TEL PAGE EXON EXONS INTRON CDS UTR HET HOM REF ALT SNV CNV DEL DUP INS MLPA LOH FDA
+    PDF NCBI OMIM HGNC GRCH37 GRCH38 HG19 HG38 CLINVAR DBSNP GNOMAD PMID NOTE SUMMARY RESULT RESULTS
+    METHOD METHODS LIMITATIONS INTERPRETATION RECOMMENDATIONS SIGNED SPECIMEN SAMPLE BLOOD SALIVA
+    FAMILY HISTORY CLINICAL SIGNIFICANCE PATHOGENIC LIKELY BENIGN UNCERTAIN VARIANT VARIANTS TYPE
+    DETECTED MALE FEMALE USA NPI ICD DIAGNOSIS PHYSICIAN ORDERING LAB LABORATORY DIRECTOR ID MD MS
+    NA NO OF TO IN ON OR AT BY AN IS BE AS IT II III IV
+""".split())
+
+
+def download_gene_symbols(path=None, url=HGNC_URL, offline=None):
+    """
+    Download the HGNC complete set once, next to the API cache, and return its
+    path. Returns None when it is not there yet and cannot be downloaded (offline
+    or the request fails).
+    """
+    from api_cache import get_cache
+    from http_session import http_get
+
+    cache = get_cache()
+    path = path or os.path.join(os.path.dirname(os.path.abspath(cache.path)), HGNC_FILE_NAME)
+    if os.path.exists(path):
+        return path
+    if cache.offline if offline is None else offline:
+        print(f"Offline mode: no HGNC symbol list at {path}")
+        return None
+
+    try:
+        response = http_get(url, stream=True)
+        if response.status_code != 200:
+            print(f"Error downloading {url}, status code: {response.status_code}")
+            response.close()
+            return None
+        tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with response, open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(64 * 1024):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except (requests.RequestException, OSError) as e:
+        print(f"Error downloading {url}: {e}")
+        return None
+    print(f"Downloaded HGNC symbols to {path}")
+    return path
+
+
+def load_gene_symbols(path=HGNC_SYMBOLS):
+    """
+    Read gene symbols from the HGNC complete set (tab-separated with symbol,
+    alias_symbol and prev_symbol columns) or from a file with one symbol per line.
+    Returns (symbols, aliases), where aliases maps old and alias symbols to the
+    approved one, or (None, {}) when no file is configured.
+    """
+    if not path:
+        return None, {}
+
+    symbols, aliases = set(), {}
+    with open(path, newline="", encoding="utf-8") as f:
+        first = f.readline()
+        if "\t" in first and "symbol" in first.split("\t"):
+            f.seek(0)
+            for row in csv.DictReader(f, delimiter="\t"):
+                symbol = row["symbol"]
+                symbols.add(symbol)
+                for column in ("alias_symbol", "prev_symbol"):
+                    for alias in (row.get(column) or "").strip('"').split("|"):
+                        if alias:
+                            aliases.setdefault(alias, symbol)
+        else:
+            f.seek(0)
+            symbols.update(line.split()[0] for line in f if line.strip())
+    return symbols, aliases
+
+
+class MentionIndex:
+    """
+    Finds gene symbols, rsIDs and HGVS strings in one pass over the text. Only
+    known symbols (and their aliases, reported under the approved symbol) count as
+    genes. Without a symbol list nothing is a gene; upper-case tokens that are not
+    common report words are collected as unverified candidates instead, since they
+    are as likely to be names or accession numbers.
+    """
+
+    def __init__(self, symbols=None, aliases=None):
+        self.symbols = frozenset(symbols) if symbols is not None else None
+        self.aliases = dict(aliases or {})
+
+    @property
+    def verified(self):
+        return self.symbols is not None
+
+    def gene(self, token):
+        if self.symbols is None:
+            return None
+        if token in self.symbols:
+            return token
+        return self.aliases.get(token)
+
+    def candidate(self, token):
+        if self.symbols is None and len(token) > 2 and token not in _STOPWORDS:
+            return token
+        return None
+
+    def _add_gene(self, token, genes, candidates):
+        gene = self.gene(token)
+        if gene:
+            genes.append(gene)
+        elif self.candidate(token):
+            candidates.append(token)
+
+    def scan(self, text):
+        """
+        Return (genes, rsids, hgvs, candidates) in order of appearance, with repeats.
+        """
+        genes, rsids, hgvs, candidates = [], [], [], []
+        for match in _MENTION_PATTERN.finditer(text):
+            kind = match.lastgroup
+            if kind == "gene":
+                self._add_gene(match.group("gene"), genes, candidates)
+            elif kind == "rsid":
+                rsids.append(match.group("rsid"))
+            else:
+                hgvs.append(match.group(kind).rstrip("."))
+                if match.group("hgvs_gene"):
+                    self._add_gene(match.group("hgvs_gene").upper(), genes, candidates)
+        return genes, rsids, hgvs, candidates
+
+
+_default_index = None
+
+
+def get_mention_index(offline=None):
+    """
+    Index over VARIANTOR_HGNC_SYMBOLS, or over the downloaded HGNC complete set when
+    that is not set. Without either the index is unverified and not kept, so the
+    download is tried again on the next scan.
+    """
+    global _default_index
+    if _default_index is None:
+        index = MentionIndex(*load_gene_symbols(HGNC_SYMBOLS or download_gene_symbols(offline=offline)))
+        if not index.verified:
+            return index
+        _default_index = index
+    return _default_index
+
+
+def document_kind(filename):
+    name = filename.lower()
+    if name.endswith(".pdf"):
+        return "pdf"
+    if name.endswith(".docx"):
+        return "docx"
+    return "text"
+
+
+def _pdf_page_count(data):
+    import pymupdf
+
+    with pymupdf.open(stream=data, filetype="pdf") as doc:
+        return doc.page_count
+
+
+def _pdf_pages(data, start, stop):
+    import pymupdf
+
+    with pymupdf.open(stream=data, filetype="pdf") as doc:
+        for number in range(start, stop):
+            yield number + 1, doc.load_page(number).get_text()
+
+
+def _docx_pages(data):
+    from docx import Document
+
+    document = Document(BytesIO(data))
+    lines = [paragraph.text for paragraph in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            lines.append("\t".join(cell.text for cell in row.cells))
+    # DOCX files have no stored page breaks; fixed-size blocks stand in for pages.
+    for i in range(0, len(lines), DOCX_PARAGRAPHS_PER_PAGE):
+        yield i // DOCX_PARAGRAPHS_PER_PAGE + 1, "\n".join(lines[i:i + DOCX_PARAGRAPHS_PER_PAGE])
+
+
+def _text_pages(data):
+    text = data.decode("utf-8", errors="ignore")
+    for number, page in enumerate(text.split("\f"), start=1):
+        yield number, page
+
+
+_worker_index = None
+_worker_data = None
+
+
+def _init_worker(index, data):
+    global _worker_index, _worker_data
+    _worker_index = index
+    _worker_data = data
+
+
+def _scan_pdf_range(page_range):
+    start, stop = page_range
+    return [(number, len(text), _worker_index.scan(text)) for number, text in _pdf_pages(_worker_data, start, stop)]
+
+
+def iter_page_mentions(data, filename, index=None, workers=INGEST_WORKERS):
+    """
+    Yield (page_number, characters, (genes, rsids, hgvs, candidates)) for each page, in page
+    order, as soon as the page is done. Large PDFs are split into ranges of
+    PAGES_PER_TASK pages that are extracted and scanned in a process pool; each
+    worker gets the document once and opens it itself, so only page results cross
+    processes.
+    """
+    index = index or get_mention_index()
+    kind = document_kind(filename)
+
+    if kind == "pdf":
+        page_count = _pdf_page_count(data)
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and page_count >= MIN_PARALLEL_PAGES:
+            ranges = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index, data)) as pool:
+                for results in pool.map(_scan_pdf_range, ranges):
+                    yield from results
+            return
+        pages = _pdf_pages(data, 0, page_count)
+    elif kind == "docx":
+        pages = _docx_pages(data)
+    else:
+        pages = _text_pages(data)
+
+    for number, text in pages:
+        yield number, len(text), index.scan(text)
+
+
+class DocumentScan:
+    """
+    Mentions found in one document, with genes ordered by first appearance.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.content_hash = None
+        self.pages = 0
+        self.characters = 0
+        self.gene_counts = {}
+        self.gene_pages = {}
+        self.rsid_pages = {}
+        self.hgvs_pages = {}
+        self.candidate_counts = {}
+        self.verified = True
+        self.elapsed = 0.0
+
+    def add_page(self, number, characters, mentions):
+        genes, rsids, hgvs, candidates = mentions
+        self.pages += 1
+        self.characters += characters
+        for gene in genes:
+            self.gene_counts[gene] = self.gene_counts.get(gene, 0) + 1
+            self.gene_pages.setdefault(gene, number)
+        for rsid in rsids:
+            self.rsid_pages.setdefault(rsid, number)
+        for item in hgvs:
+            self.hgvs_pages.setdefault(item, number)
+        for candidate in candidates:
+            self.candidate_counts[candidate] = self.candidate_counts.get(candidate, 0) + 1
+
+    @property
+    def genes(self):
+        return list(self.gene_counts)
+
+    @property
+    def candidates(self):
+        return list(self.candidate_counts)
+
+    @property
+    def rsids(self):
+        return list(self.rsid_pages)
+
+    @property
+    def hgvs(self):
+        return list(self.hgvs_pages)
+
+    @property
+    def pages_per_second(self):
+        return self.pages / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        genes = (f"{len(self.gene_counts)} gene(s)" if self.verified
+                 else f"{len(self.candidate_counts)} unverified gene candidate(s)")
+        return (f"{self.pages} page(s) in {self.elapsed:.2f}s ({self.pages_per_second:.0f} pages/s): "
+                f"{genes}, {len(self.rsid_pages)} rsID(s), {len(self.hgvs_pages)} HGVS string(s)")
+
+
+def scan_document(data, filename, index=None, workers=INGEST_WORKERS, progress=None):
+    """
+    Extract the gene symbols, rsIDs and HGVS strings mentioned in a PDF, DOCX or
+    text document. progress(pages_done) is called after every page. Without an HGNC
+    symbol list the scan is unverified: genes stays empty and possible symbols are
+    listed in candidates.
+    """
+    index = index or get_mention_index()
+    scan = DocumentScan(filename)
+    scan.verified = index.verified
+    started = time.perf_counter()
+    with span("document_scan", kind=document_kind(filename)) as stage:
+        for number, characters, mentions in iter_page_mentions(data, filename, index, workers):
+            scan.add_page(number, characters, mentions)
+            if progress is not None:
+                progress(scan.pages)
+        stage.add(bytes=len(data), items=scan.pages)
+    scan.elapsed = time.perf_counter() - started
+    print(f"Scanned {filename}: {scan.summary()}")
+    return scan
@@ -0,0 +1,30 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+MAX_WORKERS = int(os.getenv("VARIANTOR_FETCH_WORKERS", "8"))
+
+
+def fetch_panel(genes, get_genes_info, get_genes_function, get_variants, max_workers=MAX_WORKERS):
+    """
+    Fetch gene information, gene functions and variants for a panel concurrently.
+
+    The function lookup runs alongside the symbol lookup and the variant fetches,
+    and each gene's variant fetch is started as soon as its Ensembl record is known,
+    with the resolved gene_info passed in so the symbol is not looked up again.
+    Returns (genes_info, genes_function, genes_variants), each keyed by gene name.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        function_future = pool.submit(get_genes_function, genes)
+        genes_info = get_genes_info(genes)
+
+        variant_futures = {
+            gene: pool.submit(get_variants, gene, genes_info[gene])
+            for gene in genes
+            if gene in genes_info
+        }
+
+        genes_function = function_future.result()
+        genes_variants = {gene: future.result() for gene, future in variant_futures.items()}
+
+    return genes_info, genes_function, genes_variants
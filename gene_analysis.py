@@ -0,0 +1,264 @@
+import os
+import hashlib
+import streamlit as st
+from api_cache import get_cache
+from http_session import get_scheduler
+from metrics import registry
+from variant_stream import STREAM_VARIANTS
+from variant_table import SO_TERMS
+from pipeline import failed_genes, fetch_genes_data, parse_gene_panel
+from llm_client import get_client, stream_chat_response
+from chat_context import ContextBuilder, gene_key
+from retrieval import RETRIEVAL_TOP_K, ContextRetriever
+from shared_store import shared_store
+from document_ingest import get_mention_index, scan_document
+
+
+APP_CACHE_TTL = int(os.getenv("VARIANTOR_APP_CACHE_TTL", "3600"))
+REPORT_PATH = os.getenv("VARIANTOR_REPORT_PATH", "")
+
+
+@st.cache_resource(ttl=APP_CACHE_TTL, max_entries=64, show_spinner="Fetching gene data...")
+def cached_genes_data(genes, mutation_limit, consequences, stream, offline):
+    """
+    fetch_genes_data memoized on its inputs. The result is shared rather than copied,
+    so callers must not modify it. offline is part of the key, so a panel resolved
+    from the API cache alone is fetched again once the network is back.
+    """
+    return fetch_genes_data(list(genes), mutation_limit, list(consequences), stream=stream, offline=offline)
+
+
+def get_genes_data(genes, mutation_limit, consequences, stream, offline):
+    """
+    cached_genes_data, except that a panel with a failed lookup or variant fetch is
+    dropped from the cache again, so resubmitting retries it instead of serving the
+    same error to every session until the TTL runs out.
+    """
+    args = (tuple(genes), mutation_limit, tuple(consequences), stream, offline)
+    genes_data, missing_genes = cached_genes_data(*args)
+    if failed_genes(genes_data, missing_genes):
+        cached_genes_data.clear(*args)
+    return genes_data, missing_genes
+
+
+def genes_data_hash(genes_data):
+    return hashlib.sha256("".join(gene_key(gene_data) for gene_data in genes_data).encode("utf-8")).hexdigest()
+
+
+@st.cache_data(ttl=APP_CACHE_TTL, max_entries=16, show_spinner="Rendering report...")
+def cached_report(data_hash, _genes_data):
+    """
+    Report PDF keyed by the content hash of genes_data; the leading underscore keeps
+    Streamlit from hashing the variant data itself on every rerun.
+    """
+    from report import generate_report  # reportlab is only loaded once a report is requested
+
+    return generate_report(_genes_data)
+
+
+def chatbot_with_groq(question, context):
+    """
+    Streams the chatbot answer as text chunks. Repeated questions about the same
+    context are served from the response cache instead of calling Groq again.
+    """
+    return stream_chat_response(get_client(), question, context)
+
+
+def get_consequences_from_user():
+    st.subheader("Select Mutation Consequences")
+    consequences_input = st.multiselect("Choose mutation consequences from the list", SO_TERMS)
+
+    return consequences_input
+
+
+def genetic_counseling_assistant(stream_variants=STREAM_VARIANTS, offline=False):
+    st.title("Genetic Counseling Assistant")
+
+    # Initialize session state variables
+    if 'chatbot_context' not in st.session_state:
+        st.session_state.chatbot_context = ""
+    
+    if 'chatbot_response' not in st.session_state:
+        st.session_state.chatbot_response = ""
+    
+    if 'genes_data' not in st.session_state:
+        st.session_state.genes_data = []
+    
+    if 'report_generated' not in st.session_state:
+        st.session_state.report_generated = False
+    
+    if 'context_builder' not in st.session_state:
+        st.session_state.context_builder = ContextBuilder()
+    
+    if 'context_retriever' not in st.session_state:
+        st.session_state.context_retriever = ContextRetriever()
+    
+    if 'panel_genes' not in st.session_state:
+        st.session_state.panel_genes = []
+    
+    if 'genes_data_hash' not in st.session_state:
+        st.session_state.genes_data_hash = None
+
+    if 'document_scan' not in st.session_state:
+        st.session_state.document_scan = None
+
+    patient_document = st.file_uploader("Pre-fill the gene list from a patient report", type=["pdf", "docx", "txt"])
+    if patient_document is not None:
+        document_bytes = patient_document.getvalue()
+        document_hash = hashlib.sha256(document_bytes).hexdigest()
+        scan = st.session_state.document_scan
+        if scan is None or scan.content_hash != document_hash:
+            status = st.empty()
+            scan = scan_document(document_bytes, patient_document.name, get_mention_index(offline),
+                                 progress=lambda pages: status.caption(f"Scanning {patient_document.name}: {pages} page(s) done"))
+            scan.content_hash = document_hash
+            status.empty()
+            st.session_state.document_scan = scan
+        st.caption(f"{scan.filename}: {scan.summary()}")
+        if not scan.verified:
+            # Unverified tokens can be patient names or accession numbers, so they are
+            # never put in the panel (and sent upstream) without the user choosing to.
+            st.warning("No HGNC symbol list is available, so the genes in the report could not be verified and "
+                       "the gene list was not pre-filled. Set VARIANTOR_HGNC_SYMBOLS or go online once to "
+                       "download it.")
+            if scan.candidates:
+                with st.expander("Possible gene symbols (unverified)"):
+                    st.write(", ".join(scan.candidates))
+        if scan.rsids or scan.hgvs:
+            with st.expander("Variants mentioned in the report"):
+                st.write(", ".join(scan.rsids + scan.hgvs))
+    else:
+        st.session_state.document_scan = None
+
+    document_genes = st.session_state.document_scan.genes if st.session_state.document_scan else []
+
+    # Widgets inside the form do not rerun the script until it is submitted.
+    with st.form("panel_form"):
+        panel_text = st.text_area("Enter gene names (one per line or comma-separated):", value="\n".join(document_genes))
+        panel_file = st.file_uploader("Or upload a gene panel file", type=["txt", "csv", "tsv"])
+        mutation_limit = st.number_input("Enter the number of mutations to retrieve (default 5):", min_value=1, value=5)
+        consequences = get_consequences_from_user()
+        submit_consequences_button = st.form_submit_button("Submit Mutation Consequences")
+
+    if submit_consequences_button:
+        genes = parse_gene_panel(panel_text)
+        if panel_file is not None:
+            genes = parse_gene_panel(panel_text + "\n" + panel_file.getvalue().decode("utf-8", errors="ignore"))
+        st.session_state.panel_genes = genes
+
+        if genes:
+            genes_data, missing_genes = get_genes_data(genes, mutation_limit, consequences, stream_variants, offline)
+            if missing_genes:
+                st.warning(f"Gene information not found for: {', '.join(missing_genes)}")
+
+            st.session_state.genes_data = genes_data
+            st.session_state.genes_data_hash = genes_data_hash(genes_data)
+
+            st.session_state.context_builder.set_genes(genes_data)
+            st.session_state.chatbot_context = st.session_state.context_builder.build()
+            st.session_state.context_retriever.set_genes(genes_data)
+
+    genes = st.session_state.panel_genes
+
+    if genes:
+        st.write(f"{len(genes)} gene(s) in panel: {', '.join(genes)}")
+
+        context_report = st.session_state.context_builder.report
+        if context_report:
+            st.caption(
+                f"Chatbot context: {context_report['tokens']} of {context_report['budget']} tokens, "
+                f"{context_report['variants_kept']} variants included, {context_report['variants_dropped']} dropped"
+                + (f", {context_report['summaries_dropped']} function summaries dropped" if context_report['summaries_dropped'] else "")
+            )
+
+        use_retrieval = st.checkbox("Only send the gene data relevant to the question", value=RETRIEVAL_TOP_K > 0)
+        follow_up_question = st.text_input("Do you have any follow-up questions related to genetic counseling? Enter your question:")
+
+        if follow_up_question:
+            question_context = None
+            if use_retrieval:
+                question_context = st.session_state.context_retriever.context_for(follow_up_question)
+                retrieval_report = st.session_state.context_retriever.report
+                if question_context is not None:
+                    st.caption(
+                        f"Retrieved {retrieval_report['chunks']} of {retrieval_report['indexed_chunks']} chunks "
+                        f"in {retrieval_report['retrieval_ms']:.1f} ms: {retrieval_report['tokens']} tokens "
+                        f"instead of {context_report.get('tokens', 0)}"
+                    )
+            if question_context is None:
+                question_context = st.session_state.chatbot_context
+
+            st.write("Chatbot Response:")
+            response = st.write_stream(chatbot_with_groq(follow_up_question, question_context))
+            st.session_state.chatbot_response = response  # Store the response in session state
+
+        elif st.session_state.chatbot_response:
+            st.write(f"Chatbot Response: {st.session_state.chatbot_response}")
+
+        continue_session = st.radio("Would you like to process another set of gene data?", ("Yes", "No"))
+        
+        if continue_session == "No":
+            st.session_state.report_generated = True
+            st.write("You have chosen to end the session.")
+            st.write("Good Bye!")
+
+            if st.session_state.genes_data:
+                data_hash = st.session_state.genes_data_hash
+                report_content = cached_report(data_hash, st.session_state.genes_data)
+                
+                if REPORT_PATH and st.session_state.get("report_written") != data_hash:
+                    with open(REPORT_PATH, "wb") as f:
+                        f.write(report_content)
+                    st.session_state.report_written = data_hash
+
+                st.download_button(
+                    label="Download Genetic Counseling Report",
+                    data=report_content,
+                    file_name="genetic_counseling_report.pdf",
+                    mime="application/pdf"
+                )
+
+        elif continue_session == "Yes":
+            st.session_state.report_generated = False
+
+    else:
+        st.write("Please enter genes, select mutation consequences and submit to proceed.")
+
+
+def gene_analysis_page():
+    st.title("Gene Analysis")
+    st.write("Genetic counseling assistant and mutation analysis features.")
+    
+    st.write("You can input gene names and retrieve gene information, mutations, and other genetic data.")
+    
+    cache = get_cache()
+    # Kept per session; the cache's own flag (VARIANTOR_OFFLINE) is only the default.
+    offline = st.session_state.offline = st.sidebar.checkbox("Offline mode (serve from cache only)",
+                                                             value=st.session_state.get("offline", cache.offline))
+    stream_variants = st.sidebar.checkbox("Stream variant responses", value=STREAM_VARIANTS)
+    cache_stats = cache.stats()
+    st.sidebar.caption(
+        f"API cache: {cache_stats['entries']} entries, {cache_stats['bytes'] / 1e6:.1f} MB, "
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses"
+    )
+    store_stats = shared_store.stats()
+    st.sidebar.caption(
+        f"Shared results: {store_stats['entries']} entries, {store_stats['upstream_calls_saved']} lookups saved "
+        f"({store_stats['coalesced']} joined an in-flight fetch)"
+    )
+    dev_panel = st.sidebar.expander("Developer: stage timings")
+
+    genetic_counseling_assistant(stream_variants, offline)
+
+    # Filled last so the panel includes the stages run during this rerun.
+    with dev_panel:
+        stage_rows = registry.summary()
+        if stage_rows:
+            st.table(stage_rows)
+            st.caption("Recent spans")
+            st.json(registry.recent_spans(10), expanded=False)
+            st.caption("Upstream hosts")
+            st.json(get_scheduler().stats(), expanded=False)
+            st.download_button("Download Prometheus metrics", registry.prometheus(), file_name="variantor_metrics.prom")
+        else:
+            st.write("No stages have run yet.")
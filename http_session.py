@@ -0,0 +1,61 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from request_scheduler import RequestScheduler
+from metrics import record
+
+
+CONNECT_TIMEOUT = float(os.getenv("VARIANTOR_HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("VARIANTOR_HTTP_READ_TIMEOUT", "60"))
+POOL_SIZE = int(os.getenv("VARIANTOR_HTTP_POOL_SIZE", "16"))
+
+_session = None
+_scheduler = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the process-wide requests session. All upstream calls share its
+    keep-alive connection pool instead of opening a new connection per request.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def get_scheduler():
+    """
+    Return the process-wide request scheduler that rate-limits, retries and
+    circuit-breaks every call made through http_get and http_post.
+    """
+    global _scheduler
+    session = get_session()
+    with _session_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(session)
+        return _scheduler
+
+
+def _record_transfer(response, streamed):
+    # Streamed bodies are counted by the code that reads them.
+    if not streamed:
+        record(bytes=len(response.content))
+    return response
+
+
+def http_get(url, **kwargs):
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    return _record_transfer(get_scheduler().request("GET", url, **kwargs), kwargs.get("stream"))
+
+
+def http_post(url, **kwargs):
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    return _record_transfer(get_scheduler().request("POST", url, **kwargs), kwargs.get("stream"))
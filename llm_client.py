@@ -0,0 +1,110 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from metrics import Span
+
+
+CHAT_MODEL = os.getenv("VARIANTOR_CHAT_MODEL", "llama3-8b-8192")
+SYSTEM_PROMPT = "You are a helpful genetic counseling assistant."
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache of chatbot answers keyed by model, question and a hash of
+    the context, shared by every session of the process.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, question, context):
+        context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+        return (model, question.strip(), context_hash)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+response_cache = ResponseCache(int(os.getenv("VARIANTOR_CHAT_CACHE_SIZE", "256")))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the process-wide Groq client, created on first use so that starting the
+    app does not import the Groq SDK or need an API key until a question is asked.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from groq import Groq
+
+            api_key = os.getenv("GROQ_API_KEY")
+            if not api_key:
+                raise ValueError("API key not found. Make sure GROQ_API_KEY is set in the .env file.")
+            _client = Groq(api_key=api_key)
+        return _client
+
+
+def build_messages(question, context):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": question},
+        {"role": "system", "content": f"Context: {context}"}
+    ]
+
+
+def stream_chat_response(client, question, context, model=CHAT_MODEL, cache=response_cache):
+    """
+    Yield the answer to question as text chunks while the completion streams in.
+    An identical question about the same context is answered from the cache without
+    calling the API; answers are only cached once the stream has finished.
+    """
+    # The span stays open while the caller consumes the stream, so it does not
+    # collect counters recorded by unrelated code in between (track=False).
+    with Span("groq", track=False, model=model) as stage:
+        key = cache.make_key(model, question, context)
+        cached = cache.get(key)
+        if cached is not None:
+            stage.add(cache_hits=1, items=1, bytes=len(cached.encode("utf-8")))
+            yield cached
+            return
+        stage.add(cache_misses=1)
+
+        stream = client.chat.completions.create(
+            messages=build_messages(question, context),
+            model=model,
+            stream=True,
+        )
+        parts = []
+        for chunk in stream:
+            content = chunk.choices[0].delta.content if chunk.choices else None
+            if content:
+                parts.append(content)
+                stage.add(items=1, bytes=len(content.encode("utf-8")))
+                yield content
+        cache.set(key, "".join(parts))
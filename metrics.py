@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+METRICS_LOG = os.getenv("VARIANTOR_METRICS_LOG", "")
+METRICS_FILE = os.getenv("VARIANTOR_METRICS_FILE", "")
+METRICS_PORT = int(os.getenv("VARIANTOR_METRICS_PORT", "0"))
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNTERS = ("bytes", "items", "cache_hits", "cache_misses")
+SAMPLE_SIZE = 1000
+RECENT_SPANS = 200
+
+# Span lines are logged at DEBUG and only written when VARIANTOR_METRICS_LOG names
+# a file or "stderr", so an app-wide INFO log config does not pick them up.
+logger = logging.getLogger("variantor.metrics")
+if not logger.handlers and METRICS_LOG.lower() not in ("", "off", "0", "false", "no"):
+    _handler = logging.StreamHandler() if METRICS_LOG.lower() == "stderr" else logging.FileHandler(METRICS_LOG)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+_local = threading.local()
+
+
+def _active_spans():
+    if not hasattr(_local, "spans"):
+        _local.spans = []
+    return _local.spans
+
+
+def record(**counts):
+    """
+    Add counts (bytes, items, cache_hits, cache_misses, ...) to every span open in
+    the calling thread, so a stage also includes what its nested stages did.
+    """
+    for active in _active_spans():
+        active.add(**counts)
+
+
+class Span:
+    """
+    Times one pipeline stage. Counters are added with add() or, from code that does
+    not hold the span, with record(); other attributes (gene, model, ...) are only
+    logged. With track=False the span does not collect record() calls, for
+    generators that are suspended while other code runs in the same thread.
+    """
+
+    def __init__(self, stage, registry=None, track=True, **attrs):
+        self.stage = stage
+        self.registry = registry
+        self.track = track
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.attrs = attrs
+        self.started = None
+        self.timestamp = None
+        self.duration = None
+        self.error = None
+
+    def add(self, **counts):
+        for name, value in counts.items():
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def __enter__(self):
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        if self.track:
+            _active_spans().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.started
+        if self.track:
+            _active_spans().remove(self)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        (self.registry or registry).observe(self)
+        return False
+
+    def as_dict(self):
+        entry = {"stage": self.stage, "ts": round(self.timestamp, 3), "duration_ms": round(self.duration * 1000, 3)}
+        entry.update(self.counts)
+        entry.update(self.attrs)
+        if self.error:
+            entry["error"] = self.error
+        return entry
+
+
+class StageMetrics:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+    def quantile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MetricsRegistry:
+    """
+    Aggregates finished spans per stage: a duration histogram for Prometheus, the
+    latest SAMPLE_SIZE durations for p50/p99 in the app, and counter totals. Every
+    span is also logged as one JSON line, and the Prometheus text is rewritten to
+    metrics_file after each span when one is configured.
+    """
+
+    def __init__(self, metrics_file=METRICS_FILE):
+        self.metrics_file = metrics_file
+        self.stages = {}
+        self.recent = deque(maxlen=RECENT_SPANS)
+        self._lock = threading.RLock()
+
+    def observe(self, span):
+        entry = span.as_dict()
+        with self._lock:
+            stage = self.stages.get(span.stage)
+            if stage is None:
+                stage = self.stages[span.stage] = StageMetrics()
+            stage.count += 1
+            stage.total += span.duration
+            stage.last = span.duration
+            stage.samples.append(span.duration)
+            if span.error:
+                stage.errors += 1
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    stage.buckets[i] += 1
+            for name in COUNTERS:
+                stage.counts[name] += span.counts.get(name, 0)
+            self.recent.append(entry)
+            if self.metrics_file:
+                self.write_file(self.metrics_file)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(entry, default=str))
+
+    def summary(self):
+        """
+        One row per stage with call count, p50/p99/last duration in ms and counter totals.
+        """
+        with self._lock:
+            rows = []
+            for name, stage in self.stages.items():
+                row = {
+                    "stage": name,
+                    "count": stage.count,
+                    "p50_ms": round(stage.quantile(0.5) * 1000, 1),
+                    "p99_ms": round(stage.quantile(0.99) * 1000, 1),
+                    "last_ms": round(stage.last * 1000, 1),
+                    "errors": stage.errors,
+                }
+                row.update(stage.counts)
+                rows.append(row)
+            return rows
+
+    def recent_spans(self, n=20):
+        with self._lock:
+            return list(self.recent)[-n:]
+
+    def prometheus(self):
+        """
+        Render every stage in the Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = [
+                "# HELP variantor_stage_duration_seconds Time spent in each pipeline stage.",
+                "# TYPE variantor_stage_duration_seconds histogram",
+            ]
+            for name, stage in self.stages.items():
+                for bound, count in zip(DURATION_BUCKETS, stage.buckets):
+                    lines.append(f'variantor_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'variantor_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {stage.count}')
+                lines.append(f'variantor_stage_duration_seconds_sum{{stage="{name}"}} {stage.total:.6f}')
+                lines.append(f'variantor_stage_duration_seconds_count{{stage="{name}"}} {stage.count}')
+            for counter in ("errors",) + COUNTERS:
+                metric = f"variantor_stage_{counter}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for name, stage in self.stages.items():
+                    value = stage.errors if counter == "errors" else stage.counts[counter]
+                    lines.append(f'{metric}{{stage="{name}"}} {value}')
+            return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """
+        Atomically replace path with the current metrics, e.g. for the node_exporter
+        textfile collector.
+        """
+        text = self.prometheus()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+registry = MetricsRegistry()
+
+
+def span(stage, **attrs):
+    return Span(stage, **attrs)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve_metrics(port=METRICS_PORT):
+    """
+    Serve /metrics on port from a background thread, once per process. Does
+    nothing when port is 0 (VARIANTOR_METRICS_PORT unset).
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError as e:
+                print(f"Could not serve metrics on port {port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
@@ -0,0 +1,264 @@
+import re
+import requests
+from api_cache import cached_get_json, cached_bulk_json, post_json
+from fetch_engine import fetch_panel
+from variant_stream import STREAM_VARIANTS, VARIANT_REGION_SIZE, VariantFetchStats, open_variant_stream
+from variant_table import ConsequenceMatcher, VariantTable
+from variant_index import get_variant_index
+from metrics import span
+from shared_store import shared_store
+
+
+def get_genes_info_ensembl(gene_names, offline=None):
+    """
+    Fetches gene information for a panel of genes from the Ensembl REST API
+    using the bulk POST /lookup/symbol endpoint. Returns a dict keyed by the
+    requested gene name; genes that could not be found are left out. offline
+    overrides the cache's offline setting (VARIANTOR_OFFLINE) for this call.
+    """
+    url = "https://rest.ensembl.org/lookup/symbol/homo_sapiens"
+
+    def fetch_batch(batch):
+        return post_json(url, json_body={"symbols": batch})
+
+    with span("symbol_lookup", genes=len(gene_names)) as stage:
+        genes_data = cached_bulk_json("ensembl_lookup", gene_names, fetch_batch, offline=offline)
+        stage.add(items=len(genes_data))
+
+    genes_info = {}
+    for gene_name in gene_names:
+        gene_data = genes_data.get(gene_name)
+        if gene_data:
+            genes_info[gene_name] = {
+                "Gene Name": gene_data.get("display_name", "N/A"),
+                "Gene Symbol": gene_data.get("display_name", "N/A"),
+                "Gene ID": gene_data.get("id", "N/A"),
+                "Chromosome": gene_data.get("seq_region_name", "N/A"),
+                "Start": gene_data.get("start", "N/A"),
+                "End": gene_data.get("end", "N/A")
+            }
+        else:
+            print(f"Error fetching data from Ensembl for gene: {gene_name}")
+    return genes_info
+
+
+def get_gene_info_ensembl(gene_name, offline=None):
+    """
+    Fetches gene information from the Ensembl REST API.
+    """
+    return get_genes_info_ensembl([gene_name], offline).get(gene_name)
+
+
+def get_genes_function(gene_names, offline=None):
+    """
+    Fetches gene functions for a panel of genes from the mygene.info API
+    using the bulk POST /v3/query (querymany) endpoint.
+    """
+    url = "https://mygene.info/v3/query"
+
+    def fetch_batch(batch):
+        hits = post_json(url, data={
+            "q": ",".join(batch),
+            "scopes": "symbol",
+            "fields": "symbol,name,summary",
+            "species": "human"
+        })
+        if hits is None:
+            return None
+        first_hits = {}
+        for hit in hits:
+            if not hit.get("notfound") and hit.get("query") not in first_hits:
+                first_hits[hit["query"]] = hit
+        return first_hits
+
+    with span("function_lookup", genes=len(gene_names)) as stage:
+        hits = cached_bulk_json("mygene_query", gene_names, fetch_batch, offline=offline)
+        stage.add(items=len(hits))
+
+    genes_function = {}
+    for gene_name, gene_info in hits.items():
+        genes_function[gene_name] = {
+            "symbol": gene_info.get("symbol", "N/A"),
+            "name": gene_info.get("name", "N/A"),
+            "summary": gene_info.get("summary", "No function available")
+        }
+    return genes_function
+
+
+def get_gene_function(gene_name, offline=None):
+    """
+    Fetches the gene function from mygene.info API.
+    """
+    return get_genes_function([gene_name], offline).get(gene_name)
+
+
+def get_filtered_mutation_data_ensembl(gene_name, mutation_limit=5, mutation_type_filters=["stop_gained"], gene_info=None,
+                                       stream=STREAM_VARIANTS, region_size=VARIANT_REGION_SIZE, offline=None):
+    """
+    Fetches mutation data for a gene from Ensembl and applies filters for each mutation type separately.
+    Each mutation type gets its own limit. Pass an already resolved gene_info to skip the symbol lookup.
+    In stream mode variants are parsed as the response arrives and reading stops once every
+    mutation type has reached its limit; region_size additionally splits the gene into sub-region queries.
+    When a local variant index is configured (VARIANTOR_VARIANT_INDEX) it is used instead of the REST call.
+    """
+    with span("variant_fetch", gene=gene_name) as stage:
+        if gene_info is None:
+            gene_info = get_gene_info_ensembl(gene_name, offline)
+
+        if gene_info:
+            gene_id = gene_info["Gene ID"]
+            print(f"Fetching mutations for Gene ID: {gene_id}")
+
+            url = f"https://rest.ensembl.org/overlap/id/{gene_id}?feature=variation;content-type=application/json"
+
+            stats = VariantFetchStats()
+            variant_index = get_variant_index()
+            if variant_index is not None:
+                mutation_data = variant_index.iter_overlap(
+                    gene_info["Chromosome"], gene_info["Start"], gene_info["End"], mutation_type_filters
+                )
+            elif stream:
+                mutation_data = open_variant_stream(url, gene_info, stats, region_size=region_size, offline=offline)
+            else:
+                mutation_data = cached_get_json("ensembl_overlap", url, offline=offline)
+
+            if mutation_data is not None:
+                if isinstance(mutation_data, list):
+                    print(f"Received {len(mutation_data)} mutations from Ensembl.")
+
+                scanned = 0
+                matcher = ConsequenceMatcher(mutation_type_filters)
+                table = VariantTable()
+                seen_variants = set()
+                count_per_mutation_type = [0] * len(mutation_type_filters)
+                error = None
+
+                with span("filtering", gene=gene_name, filters=len(mutation_type_filters)) as filtering:
+                    if mutation_type_filters:
+                        try:
+                            for mutation in mutation_data:
+                                scanned += 1
+                                consequence_type = mutation.get("consequence_type", [])
+
+                                if isinstance(consequence_type, str):
+                                    consequence_type = [consequence_type]
+
+                                mask, hits = matcher.match(consequence_type)
+                                if not hits or all(count_per_mutation_type[i] >= mutation_limit for i in hits):
+                                    continue
+
+                                variation_id = mutation.get("id", "N/A")
+                                if variation_id in seen_variants:
+                                    continue
+                                seen_variants.add(variation_id)
+
+                                table.append(mutation, mask)
+                                stats.mark_first_result()
+
+                                for i in hits:
+                                    count_per_mutation_type[i] += 1
+
+                                if all(count >= mutation_limit for count in count_per_mutation_type):
+                                    break
+                        except (requests.RequestException, ValueError) as e:
+                            # A cut-off or unreadable body must not look like "no mutations found".
+                            error = e
+
+                    if not isinstance(mutation_data, list):
+                        mutation_data.close()
+                    stats.finish()
+                    print(f"Scanned {scanned} mutations for {gene_name}: {stats.summary()}")
+
+                    selected, count_per_mutation_type = table.select_per_filter(mutation_type_filters, mutation_limit)
+                    mutations = table.view(selected)
+                    filtering.add(items=len(mutations))
+                stage.add(items=scanned)
+
+                if error is not None:
+                    print(f"Error reading mutation data from Ensembl for gene ID: {gene_id}: {error}")
+                    return "Error fetching mutation data from Ensembl."
+
+                for mt in mutation_type_filters:
+                    print(f"Found {count_per_mutation_type[mt]} mutations for {mt}.")
+
+                print(f"Total filtered mutations: {len(mutations)}")
+
+                return mutations if mutations else "No mutations found that match the criteria."
+            else:
+                stats.finish()
+                print(f"Error fetching mutation data from Ensembl for gene ID: {gene_id}")
+                return "Error fetching mutation data from Ensembl."
+        else:
+            print(f"Gene information not found for {gene_name}")
+            return "Gene information not found."
+
+
+def parse_gene_panel(text):
+    """
+    Split pasted or uploaded panel text into a de-duplicated list of gene names.
+    """
+    genes = []
+    seen = set()
+    for token in re.split(r"[\s,;]+", text or ""):
+        if token and token not in seen:
+            seen.add(token)
+            genes.append(token)
+    return genes
+
+
+def _is_variant_result(mutations):
+    # Error messages are returned as strings too; only keep real answers.
+    return not isinstance(mutations, str) or mutations.startswith("No mutations")
+
+
+def failed_genes(genes_data, missing_genes):
+    """
+    Genes of a fetch_genes_data result whose lookup or variant fetch failed. A result
+    is only worth keeping or counting as done when this is empty.
+    """
+    return list(missing_genes) + [
+        gene_info["Gene Symbol"] for gene_info, _, mutations in genes_data if not _is_variant_result(mutations)
+    ]
+
+
+def _shared_bulk(kind, gene_names, fetch, offline=None):
+    values = shared_store.get_many(
+        [(kind, gene, offline) for gene in gene_names],
+        lambda keys: {(kind, gene, offline): value for gene, value in fetch([key[1] for key in keys], offline).items()},
+    )
+    return {gene: values[(kind, gene, offline)] for gene in gene_names if (kind, gene, offline) in values}
+
+
+def fetch_genes_data(genes, mutation_limit=5, consequences=["stop_gained"], stream=STREAM_VARIANTS, offline=None):
+    """
+    Runs the fetch and filter pipeline for a panel of genes. Returns (genes_data, missing_genes),
+    where genes_data holds one (gene_info, gene_function, mutations) tuple per resolved gene.
+    Results go through the process-wide shared store, so sessions asking for the same genes
+    and filters at the same time share one upstream fetch. offline overrides the cache's
+    offline setting for this panel only; it is part of the shared keys, so an offline
+    session never joins an online fetch or the other way round.
+    """
+    variant_key = (mutation_limit, tuple(consequences), stream, offline)
+
+    def get_variants(gene, gene_info):
+        return shared_store.get(
+            ("variants", gene) + variant_key,
+            lambda: get_filtered_mutation_data_ensembl(gene, mutation_limit, consequences, gene_info=gene_info,
+                                                       stream=stream, offline=offline),
+            cacheable=_is_variant_result,
+        )
+
+    genes_info, genes_function, genes_mutations = fetch_panel(
+        genes,
+        lambda names: _shared_bulk("gene_info", names, get_genes_info_ensembl, offline),
+        lambda names: _shared_bulk("gene_function", names, get_genes_function, offline),
+        get_variants
+    )
+
+    missing_genes = [gene for gene in genes if gene not in genes_info]
+    genes_data = [
+        (genes_info[gene], genes_function.get(gene), genes_mutations[gene])
+        for gene in genes
+        if gene in genes_info
+    ]
+    return genes_data, missing_genes
@@ -0,0 +1,305 @@
+import os
+from io import BytesIO
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from metrics import span
+
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+HEADER_HEIGHT = 50
+FOOTER_HEIGHT = 40
+CONTENT_BOTTOM_MARGIN = FOOTER_HEIGHT + 20
+X_OFFSET = 120
+TITLE = "Genetic Counseling Report"
+TITLE_COLOR = (0.2, 0.4, 0.6)
+LINE_HEIGHT = 15
+HEADING_HEIGHT = 30
+REPORT_WORKERS = int(os.getenv("VARIANTOR_REPORT_WORKERS", "0"))
+
+
+@lru_cache(maxsize=100000)
+def word_width(word, font_name, font_size):
+    return stringWidth(word, font_name, font_size)
+
+
+def wrap_text(text, width, font_size, font_name="Helvetica", x_offset=100):
+    """
+    Wrap the text to fit within the given width and adjust for right padding.
+    Each word is measured once (and cached), so wrapping is linear in the text length.
+    """
+    max_width = width - x_offset - 100  # Adjusted for more right padding
+    space_width = word_width(" ", font_name, font_size)
+    lines = []
+    current_words = []
+    current_width = 0
+    empty = True
+
+    for word in text.split(" "):
+        w = word_width(word, font_name, font_size)
+        test_width = w if empty else current_width + space_width + w
+        if test_width <= max_width:
+            if empty:
+                current_words = [word]
+            else:
+                current_words.append(word)
+            current_width = test_width
+            empty = empty and not word
+        else:
+            lines.append(" ".join(current_words))
+            current_words = [word]
+            current_width = w
+            empty = not word
+
+    if not empty:
+        lines.append(" ".join(current_words))
+
+    return lines
+
+
+def draw_underline(c, text, x_position, y_position, font_name="Helvetica-Bold", font_size=12, x_offset=100, line_padding=0):
+    """
+    Draw an underline beneath the text at the given position with more padding from the right.
+    """
+    text_width = word_width(text, font_name, font_size)
+    c.drawString(x_position, y_position, text)
+    c.line(x_position, y_position - 2, x_position + text_width + line_padding, y_position - 2)
+
+
+def draw_full_line(c, y_position, width=500, x_offset=100, line_padding=0):
+    """
+    Draw a full-width horizontal line to separate gene sections with more right padding.
+    """
+    c.setStrokeColorRGB(0, 0, 0)
+    c.setLineWidth(1)
+    c.line(x_offset, y_position, x_offset + width + line_padding, y_position)
+
+
+class _LayoutCanvas:
+    """
+    Stand-in canvas that draws nothing and only counts pages, used to lay a report
+    out before rendering it.
+    """
+
+    def __init__(self):
+        self.pages = 0
+
+    def showPage(self):
+        self.pages += 1
+
+    def _ignore(self, *args, **kwargs):
+        pass
+
+    setFont = setFillColorRGB = setStrokeColorRGB = setLineWidth = drawString = line = save = _ignore
+
+
+class ReportRenderer:
+    """
+    Lays report content out on fixed letter-size pages with a title on every page.
+    Pages are compressed, but reportlab keeps the whole document until save(), so
+    memory still grows with the report size. With page_total set, each page gets a
+    "Page n of N" footer starting at first_page.
+    """
+
+    def __init__(self, output, first_page=1, page_total=None):
+        self.c = _LayoutCanvas() if output is None else canvas.Canvas(output, pagesize=letter, pageCompression=1)
+        self.page_number = first_page
+        self.page_total = page_total
+        self.c.setFont("Helvetica", 14)
+        self.y = PAGE_HEIGHT - HEADER_HEIGHT - 20
+        self.c.setFillColorRGB(*TITLE_COLOR)
+        self.c.drawString(X_OFFSET, self.y, TITLE)
+        self.y -= 30
+
+    def finish_page(self):
+        if self.page_total:
+            self.c.setFont("Helvetica", 9)
+            self.c.drawString(PAGE_WIDTH - X_OFFSET - 60, FOOTER_HEIGHT - 15, f"Page {self.page_number} of {self.page_total}")
+        self.page_number += 1
+        self.c.showPage()
+
+    def new_page(self):
+        self.finish_page()
+        self.c.setFont("Helvetica", 14)
+        self.c.setFillColorRGB(*TITLE_COLOR)
+        self.y = PAGE_HEIGHT - HEADER_HEIGHT - 20
+        self.c.drawString(X_OFFSET, self.y, TITLE)
+        self.y -= 30
+
+        self.c.setFont("Helvetica", 10)
+
+    def check_page_break(self):
+        """Check if the current y position is too low and a page break is needed"""
+        if self.y < CONTENT_BOTTOM_MARGIN:
+            self.new_page()
+
+    def heading(self, text):
+        self.c.setFont("Helvetica-Bold", 12)
+        draw_underline(self.c, text, X_OFFSET, self.y, x_offset=X_OFFSET)
+        self.y -= HEADING_HEIGHT
+        self.check_page_break()
+        self.c.setFont("Helvetica", 10)
+
+    def paragraph(self, text):
+        for line in wrap_text(text, PAGE_WIDTH, 10, x_offset=X_OFFSET):
+            self.check_page_break()
+            self.c.drawString(X_OFFSET, self.y, line)
+            self.y -= LINE_HEIGHT
+
+    def message(self, text):
+        self.c.drawString(X_OFFSET, self.y, text)
+        self.y -= 20
+
+    def gene_section(self, gene_info, gene_function, mutations):
+        self.heading(f"Gene Information: {gene_info.get('Gene Symbol', 'N/A') if gene_info else 'N/A'}")
+        if gene_info:
+            for key, value in gene_info.items():
+                self.paragraph(f"{key}: {value}")
+        else:
+            self.message("No gene information available.")
+
+        self.y -= 20
+
+        self.heading("Gene Function:")
+        if gene_function:
+            self.paragraph(f"Name: {gene_function['name']}")
+            self.paragraph(f"Symbol: {gene_function['symbol']}")
+            self.paragraph(f"Function Summary: {gene_function['summary']}")
+        else:
+            self.message("No gene function information available.")
+
+        self.y -= 40
+
+        self.heading("Mutation Interpretation:")
+        if mutations and not isinstance(mutations, str):
+            for mutation in mutations:
+                self.paragraph(f"Variation: {mutation['Variation']}")
+                self.paragraph(f"Location: {mutation['Location']}")
+                self.paragraph(f"Consequence: {mutation['Consequence']}")
+                self.paragraph(f"Alleles: {mutation['Allele']}")
+                self.y -= 20
+        else:
+            self.message(mutations if mutations else "No mutation information available.")
+
+        self.y -= 40
+        draw_full_line(self.c, self.y, width=500, x_offset=X_OFFSET, line_padding=20)
+        self.y -= 40
+
+    def save(self):
+        self.finish_page()
+        self.c.save()
+
+
+def write_report(genes_data, output):
+    """
+    Render the report for genes_data to output, a file path or a binary stream. The
+    document is written out when it is saved, not page by page.
+    """
+    with span("report", genes=len(genes_data), mode="serial") as stage:
+        renderer = ReportRenderer(output)
+        for gene_info, gene_function, mutations in genes_data:
+            renderer.gene_section(gene_info, gene_function, mutations)
+        renderer.save()
+        stage.add(items=renderer.page_number - 1, bytes=_output_size(output))
+
+
+def _output_size(output):
+    if isinstance(output, str):
+        return os.path.getsize(output)
+    return output.tell() if hasattr(output, "tell") else 0
+
+
+def render_sections(genes_data, first_page=1, page_total=None, layout_only=False):
+    """
+    Render genes to a standalone PDF in which every gene starts on a new page.
+    With layout_only, nothing is drawn and the number of pages is returned instead.
+    """
+    buffer = None if layout_only else BytesIO()
+    renderer = ReportRenderer(buffer, first_page=first_page, page_total=page_total)
+    for i, (gene_info, gene_function, mutations) in enumerate(genes_data):
+        if i:
+            renderer.new_page()
+        renderer.gene_section(gene_info, gene_function, mutations)
+    renderer.save()
+    return renderer.c.pages if layout_only else buffer.getvalue()
+
+
+def _count_chunk_pages(chunk):
+    return render_sections(chunk, layout_only=True)
+
+
+def _render_chunk(args):
+    return render_sections(*args)
+
+
+def _picklable(genes_data):
+    """
+    Copy variant views into plain lists of dicts. A VariantView holds its whole
+    VariantTable, whose consequence index has a lock and cannot be sent to a worker.
+    """
+    return [
+        (gene_info, gene_function, mutations if isinstance(mutations, str) else list(mutations))
+        for gene_info, gene_function, mutations in genes_data
+    ]
+
+
+def generate_report_parallel(genes_data, output=None, workers=REPORT_WORKERS):
+    """
+    Render gene sections in a process pool and merge them with PyMuPDF. Each gene
+    starts on a new page. A layout pass counts the pages of every chunk first, so
+    each worker can number its pages "Page n of N" while rendering. Writes to
+    output (a path or binary stream) if given, otherwise returns the PDF bytes.
+    """
+    import pymupdf  # only needed to merge parallel sections
+
+    workers = workers or os.cpu_count() or 1
+    genes_data = _picklable(genes_data)
+    with span("report", genes=len(genes_data), mode="parallel", workers=workers) as stage:
+        chunk_size = max(1, -(-len(genes_data) // (workers * 4)))
+        chunks = [genes_data[i:i + chunk_size] for i in range(0, len(genes_data), chunk_size)]
+
+        if workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                page_counts = list(pool.map(_count_chunk_pages, chunks))
+                first_pages = [1 + sum(page_counts[:i]) for i in range(len(chunks))]
+                jobs = [(chunk, first, sum(page_counts)) for chunk, first in zip(chunks, first_pages)]
+                parts = list(pool.map(_render_chunk, jobs))
+        else:
+            page_counts = [_count_chunk_pages(chunk) for chunk in chunks]
+            first_pages = [1 + sum(page_counts[:i]) for i in range(len(chunks))]
+            parts = [render_sections(chunk, first, sum(page_counts)) for chunk, first in zip(chunks, first_pages)]
+
+        merged = pymupdf.open()
+        for part in parts:
+            with pymupdf.open(stream=part, filetype="pdf") as doc:
+                merged.insert_pdf(doc)
+        stage.add(items=merged.page_count)
+
+        if output is None:
+            pdf_content = merged.tobytes(garbage=1)
+            merged.close()
+            stage.add(bytes=len(pdf_content))
+            return pdf_content
+        if isinstance(output, str):
+            merged.save(output, garbage=1)
+        else:
+            output.write(merged.tobytes(garbage=1))
+        merged.close()
+        stage.add(bytes=_output_size(output))
+
+
+def generate_report(genes_data, workers=REPORT_WORKERS):
+    """
+    Generate a combined PDF report for multiple genes with improved formatting and page handling.
+    With workers > 1 (VARIANTOR_REPORT_WORKERS) gene sections are rendered in parallel.
+    """
+    if workers > 1 and len(genes_data) > 1:
+        return generate_report_parallel(genes_data, workers=workers)
+
+    buffer = BytesIO()
+    write_report(genes_data, buffer)
+    pdf_content = buffer.getvalue()
+    buffer.close()
+    return pdf_content
@@ -0,0 +1,258 @@
+import os
+import time
+import random
+import threading
+from urllib.parse import urlparse
+import requests
+
+
+DEFAULT_RATE = 10.0
+DEFAULT_RATES = {"rest.ensembl.org": 15.0, "mygene.info": 10.0}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRIES = int(os.getenv("VARIANTOR_HTTP_MAX_RETRIES", "4"))
+MAX_CONCURRENCY = int(os.getenv("VARIANTOR_HTTP_MAX_CONCURRENCY", "8"))
+
+
+class CircuitOpenError(requests.RequestException):
+    pass
+
+
+def _rates_from_env():
+    rates = dict(DEFAULT_RATES)
+    for pair in os.getenv("VARIANTOR_RATE_LIMITS", "").split(","):
+        if "=" in pair:
+            host, rate = pair.split("=", 1)
+            rates[host.strip()] = float(rate)
+    return rates
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` requests per second with bursts up to `capacity`.
+    pause_until() blocks every caller until the given time, for Retry-After and
+    exhausted rate-limit windows.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause_until(self, until):
+        with self._lock:
+            self.paused_until = max(self.paused_until, until)
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects requests for
+    `reset_timeout` seconds, then lets a single trial request through.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+    def record_throttled(self):
+        """
+        A 429 does not count towards the threshold, but it still ends a trial:
+        the circuit stays open for another `reset_timeout`.
+        """
+        with self._lock:
+            if self._trial:
+                self.opened_at = time.monotonic()
+                self._trial = False
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit adjusted with additive increase / multiplicative decrease:
+    every throttled response halves it, every success grows it by 1/limit.
+    """
+
+    def __init__(self, max_limit=MAX_CONCURRENCY):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.active = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self.active >= int(self.limit):
+                self._condition.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def throttled(self):
+        with self._condition:
+            self.limit = max(1.0, self.limit / 2)
+
+    def succeeded(self):
+        with self._condition:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class HostState:
+    def __init__(self, rate):
+        self.bucket = TokenBucket(rate)
+        self.breaker = CircuitBreaker()
+        self.limiter = AdaptiveLimiter()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+
+
+class RequestScheduler:
+    """
+    Sends every upstream request through per-host rate limiting, rate-limit header
+    handling, jittered exponential backoff, a circuit breaker and an adaptive
+    concurrency limit.
+    """
+
+    def __init__(self, session, rates=None, max_retries=MAX_RETRIES, backoff_base=0.5, backoff_cap=30.0):
+        self.session = session
+        self.rates = rates if rates is not None else _rates_from_env()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host_state(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = HostState(self.rates.get(host, DEFAULT_RATE))
+            return self._hosts[host]
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def observe_headers(self, state, headers):
+        """
+        Pause the host's bucket on Retry-After, or when X-RateLimit-Remaining says
+        the current window is used up (until X-RateLimit-Reset seconds from now).
+        """
+        now = time.monotonic()
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            try:
+                state.bucket.pause_until(now + float(retry_after))
+            except ValueError:
+                pass
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset is not None:
+            try:
+                if int(remaining) <= 0:
+                    state.bucket.pause_until(now + float(reset))
+            except ValueError:
+                pass
+
+    def request(self, method, url, **kwargs):
+        state = self.host_state(urlparse(url).netloc)
+        last_error = None
+        response = None
+
+        for attempt in range(self.max_retries + 1):
+            if not state.breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc}, not calling {url}")
+
+            state.bucket.acquire()
+            state.requests += 1
+            if attempt:
+                state.retries += 1
+            try:
+                with state.limiter:
+                    response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                last_error = e
+                response = None
+                state.breaker.record_failure()
+                time.sleep(self.backoff(attempt))
+                continue
+
+            self.observe_headers(state, response.headers)
+
+            if response.status_code == 429:
+                state.throttled += 1
+                state.limiter.throttled()
+                state.breaker.record_throttled()
+            elif response.status_code >= 500:
+                state.breaker.record_failure()
+            else:
+                state.breaker.record_success()
+                state.limiter.succeeded()
+                return response
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            response.close()
+            if not response.headers.get("Retry-After"):
+                time.sleep(self.backoff(attempt))
+
+        if response is not None:
+            return response
+        raise last_error
+
+    def stats(self):
+        with self._lock:
+            return {
+                host: {
+                    "requests": state.requests,
+                    "retries": state.retries,
+                    "throttled": state.throttled,
+                    "concurrency_limit": int(state.limiter.limit),
+                    "circuit_open": state.breaker.opened_at is not None,
+                }
+                for host, state in self._hosts.items()
+            }
@@ -0,0 +1,148 @@
+import os
+import re
+import math
+import time
+import heapq
+from collections import defaultdict
+from chat_context import GeneSection, gene_key, count_tokens
+from metrics import span
+
+
+RETRIEVAL_TOP_K = int(os.getenv("VARIANTOR_RETRIEVAL_TOP_K", "20"))
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _WORD_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Incremental in-memory BM25 index. Documents can be added and removed at any
+    time; document frequencies and the average length are read at query time.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)
+        self.doc_lengths = {}
+        self.documents = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, doc_id, text):
+        if doc_id in self.documents:
+            self.remove(doc_id)
+        terms = tokenize(text)
+        counts = defaultdict(int)
+        for term in terms:
+            counts[term] += 1
+        for term, tf in counts.items():
+            self.postings[term][doc_id] = tf
+        self.documents[doc_id] = text
+        self.doc_lengths[doc_id] = len(terms)
+        self.total_length += len(terms)
+
+    def remove(self, doc_id):
+        text = self.documents.pop(doc_id, None)
+        if text is None:
+            return
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def search(self, query, k=10):
+        """
+        Return up to k (score, doc_id) pairs, best first. Documents sharing no term
+        with the query are never returned.
+        """
+        n = len(self.documents)
+        if not n:
+            return []
+        average_length = self.total_length / n or 1
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        # Ranked on the score alone: doc ids need not be comparable with each other,
+        # and ties keep indexing order.
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(score, doc_id) for doc_id, score in best]
+
+
+class ContextRetriever:
+    """
+    Indexes each gene's function summary and each variant as separate chunks so a
+    follow-up question only sends the gene headers plus its top-k chunks to the model.
+    Genes are indexed once and removed when they leave genes_data.
+    """
+
+    def __init__(self, top_k=RETRIEVAL_TOP_K):
+        self.top_k = top_k
+        self.index = BM25Index()
+        self._genes = {}
+        self._order = []
+        self.report = {}
+
+    def set_genes(self, genes_data):
+        keys = []
+        for gene_data in genes_data:
+            key = gene_key(gene_data)
+            if key not in self._genes:
+                self._add(key, GeneSection(*gene_data))
+            keys.append(key)
+        for key in list(self._genes):
+            if key not in keys:
+                for doc_id in self._genes.pop(key)[1]:
+                    self.index.remove(doc_id)
+        self._order = keys
+
+    def _add(self, key, section):
+        doc_ids = []
+        if section.summary:
+            doc_id = (key, "summary")
+            self.index.add(doc_id, f"{section.symbol} {section.summary}")
+            doc_ids.append(doc_id)
+        for rank, position, line, tokens in section.variants:
+            doc_id = (key, position)
+            self.index.add(doc_id, f"{section.symbol} variant {line}")
+            doc_ids.append(doc_id)
+        self._genes[key] = (section.header, doc_ids)
+
+    def context_for(self, question, top_k=None):
+        """
+        Build the context for one question. Returns None when nothing in the index
+        matches, so the caller can fall back to the full context.
+        """
+        with span("context_retrieval", indexed_chunks=len(self.index)) as stage:
+            started = time.perf_counter()
+            hits = self.index.search(question, top_k or self.top_k)
+            elapsed = time.perf_counter() - started
+            stage.add(items=len(hits))
+        if not hits:
+            self.report = {"retrieval_ms": elapsed * 1000, "chunks": 0, "tokens": 0}
+            return None
+
+        headers = [self._genes[key][0] for key in self._order]
+        chunks = [self.index.documents[doc_id] for _, doc_id in hits]
+        text = "\n\n".join(headers) + "\n\nRelevant excerpts (id alleles consequences for variants):\n" + "\n".join(chunks)
+        self.report = {
+            "retrieval_ms": elapsed * 1000,
+            "chunks": len(chunks),
+            "indexed_chunks": len(self.index),
+            "tokens": count_tokens(text),
+        }
+        return text
@@ -0,0 +1,142 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+
+SHARED_STORE_SIZE = int(os.getenv("VARIANTOR_SHARED_STORE_SIZE", "2048"))
+SHARED_STORE_TTL = int(os.getenv("VARIANTOR_SHARED_STORE_TTL", "3600"))
+
+_MISSING = object()
+
+
+def _always(value):
+    return True
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = _MISSING
+        self.error = None
+
+
+class SharedStore:
+    """
+    Process-wide LRU of pipeline results shared by every session, with single-flight
+    coalescing: while one thread computes a key, other threads asking for the same
+    key wait for that result instead of calling upstream themselves. Entries expire
+    after ttl seconds and at most max_entries are kept. Failures are never stored,
+    and neither are values rejected by the cacheable predicate.
+    """
+
+    def __init__(self, max_entries=SHARED_STORE_SIZE, ttl=SHARED_STORE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.coalesced = 0
+        self.computed = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires = entry
+        if expires < now:
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _claim(self, keys):
+        """
+        Sort keys into cached values, calls already in flight, and keys the caller
+        now has to compute. Must be called with the lock held.
+        """
+        now = time.monotonic()
+        results, waiting, leading = {}, {}, {}
+        for key in keys:
+            value = self._lookup(key, now)
+            if value is not _MISSING:
+                self.hits += 1
+                results[key] = value
+            elif key in self._inflight:
+                self.coalesced += 1
+                waiting[key] = self._inflight[key]
+            elif key not in leading:
+                leading[key] = self._inflight[key] = _Call()
+        self.computed += len(leading)
+        return results, waiting, leading
+
+    def _finish(self, leading, values, error, cacheable):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key, call in leading.items():
+                call.error = error
+                call.value = values.get(key, _MISSING)
+                if error is None and call.value is not _MISSING and cacheable(call.value):
+                    self._entries[key] = (call.value, expires)
+                    self._entries.move_to_end(key)
+                del self._inflight[key]
+                call.done.set()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _collect(results, waiting):
+        for key, call in waiting.items():
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            if call.value is not _MISSING:
+                results[key] = call.value
+        return results
+
+    def get(self, key, compute, cacheable=_always):
+        """
+        Return the value for key, calling compute() only if no other thread is
+        already computing it.
+        """
+        return self.get_many([key], lambda keys: {key: compute()}, cacheable).get(key)
+
+    def get_many(self, keys, compute_many, cacheable=_always):
+        """
+        Resolve many keys at once for bulk endpoints. compute_many(keys) is called
+        with only the keys that are neither stored nor in flight, and returns a dict;
+        keys it leaves out are left out of the result as well.
+        """
+        with self._lock:
+            results, waiting, leading = self._claim(keys)
+
+        if leading:
+            values, error = {}, None
+            try:
+                values = compute_many(list(leading))
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self._finish(leading, values, error, cacheable)
+            results.update((key, values[key]) for key in leading if key in values)
+
+        return self._collect(results, waiting)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "computed": self.computed,
+                "upstream_calls_saved": self.hits + self.coalesced,
+            }
+
+
+shared_store = SharedStore()
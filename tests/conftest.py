@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import tempfile
+import pytest
+
+# Modules read their settings at import time, so the environment is fixed before
+# any of them is imported: a private API cache, offline so nothing reaches the
+# network, and no span log on stderr.
+os.environ["VARIANTOR_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="variantor_tests_"), "cache.sqlite3")
+os.environ["VARIANTOR_OFFLINE"] = "1"
+os.environ["VARIANTOR_METRICS_LOG"] = "off"
+os.environ.pop("VARIANTOR_METRICS_FILE", None)
+os.environ.pop("VARIANTOR_VARIANT_INDEX", None)
+os.environ.pop("VARIANTOR_HGNC_SYMBOLS", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_cache import get_cache
+from shared_store import shared_store
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    get_cache().clear()
+    shared_store.clear()
+    yield
+    get_cache().clear()
+    shared_store.clear()
+
+
+def seed_gene(gene, gene_id, chromosome, start, end, variants):
+    """
+    Put a gene's symbol lookup, function summary and overlap response in the API
+    cache, so the pipeline resolves it offline.
+    """
+    cache = get_cache()
+    cache.set("ensembl_lookup", {"key": gene}, json.dumps({
+        "display_name": gene, "id": gene_id, "seq_region_name": chromosome, "start": start, "end": end,
+    }))
+    cache.set("mygene_query", {"key": gene}, json.dumps({"query": gene, "symbol": gene, "summary": f"{gene} summary."}))
+    cache.set("ensembl_overlap", {
+        "url": f"https://rest.ensembl.org/overlap/id/{gene_id}?feature=variation;content-type=application/json",
+        "params": None,
+    }, json.dumps(variants))
@@ -0,0 +1,64 @@
+import json
+import pytest
+import api_cache
+import variant_stream
+from api_cache import cached_bulk_json, cached_get_json, get_cache
+from variant_stream import VariantFetchStats
+
+URL = "https://rest.ensembl.org/lookup/id/ENSG00000141510"
+
+
+class Response:
+    status_code = 200
+
+    def __init__(self, body):
+        self.text = json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+@pytest.fixture
+def expired(monkeypatch):
+    """
+    Every entry counts as expired, and upstream answers with {"fresh": true}.
+    """
+    cache = get_cache()
+    monkeypatch.setattr(cache, "ttls", dict.fromkeys(cache.ttls, -1))
+    calls = []
+    monkeypatch.setattr(api_cache, "http_get", lambda url, **kwargs: calls.append(url) or Response({"fresh": True}))
+    cache.set("ensembl_lookup", {"url": URL, "params": None}, json.dumps({"fresh": False}))
+    cache.set("mygene_query", {"key": "TP53"}, json.dumps({"fresh": False}))
+    return cache, calls
+
+
+def test_offline_session_is_served_expired_entries(expired, monkeypatch):
+    cache, calls = expired
+    monkeypatch.setattr(cache, "offline", False)
+
+    assert cached_get_json("ensembl_lookup", URL, offline=True) == {"fresh": False}
+    assert cached_bulk_json("mygene_query", ["TP53"], lambda batch: None, offline=True) == {"TP53": {"fresh": False}}
+    assert calls == []
+
+
+def test_online_session_refetches_expired_entries_when_the_cache_defaults_to_offline(expired, monkeypatch):
+    cache, calls = expired
+    monkeypatch.setattr(cache, "offline", True)
+
+    assert cached_get_json("ensembl_lookup", URL, offline=False) == {"fresh": True}
+    assert calls == [URL]
+    fetched = cached_bulk_json("mygene_query", ["TP53"], lambda batch: {"TP53": {"fresh": True}}, offline=False)
+    assert fetched == {"TP53": {"fresh": True}}
+
+
+def test_offline_session_streams_expired_overlap_windows(monkeypatch):
+    cache = get_cache()
+    monkeypatch.setattr(cache, "offline", False)
+    monkeypatch.setattr(cache, "ttls", dict.fromkeys(cache.ttls, -1))
+    url = variant_stream.OVERLAP_REGION_URL.format(chromosome="17", start=1, end=100)
+    cache.set("ensembl_overlap", {"url": url, "params": None}, json.dumps([{"id": "rs1"}]))
+    monkeypatch.setattr(variant_stream, "http_get", lambda *args, **kwargs: pytest.fail("must not go upstream"))
+
+    variants = variant_stream.open_region("17", 1, 100, VariantFetchStats(), offline=True)
+
+    assert [variant["id"] for variant in variants] == ["rs1"]
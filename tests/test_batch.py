@@ -0,0 +1,57 @@
+import json
+import batch
+from batch import run_batch
+
+ERROR = "Error fetching mutation data from Ensembl."
+
+
+def _gene_data(gene, mutations):
+    return {"Gene Symbol": gene}, None, mutations
+
+
+def _fake_pipeline(monkeypatch, responses):
+    """
+    fetch_genes_data returns responses[gene] for each gene: a mutation list, the
+    error string, or None for a gene whose lookup failed.
+    """
+    calls = []
+
+    def fetch_genes_data(genes, mutation_limit, consequences):
+        calls.append(list(genes))
+        genes_data = [_gene_data(gene, responses[gene]) for gene in genes if responses[gene] is not None]
+        return genes_data, [gene for gene in genes if responses[gene] is None]
+
+    monkeypatch.setattr(batch, "fetch_genes_data", fetch_genes_data)
+    monkeypatch.setattr(batch, "write_report", lambda genes_data, path: None)
+    return calls
+
+
+def _case(case_id, genes):
+    return {"case_id": case_id, "genes": genes, "consequences": ["stop_gained"], "mutation_limit": 5}
+
+
+def test_cases_with_failed_genes_are_not_ok(tmp_path, monkeypatch):
+    _fake_pipeline(monkeypatch, {"TP53": [], "BRCA1": ERROR, "BRCA2": None})
+    cases = [_case("ok", ["TP53"]), _case("partial", ["TP53", "BRCA1"]), _case("error", ["BRCA1", "BRCA2"])]
+
+    summary = run_batch(cases, str(tmp_path), workers=1)
+
+    assert [record["status"] for record in summary] == ["ok", "partial", "error"]
+    assert summary[1]["failed_genes"] == ["BRCA1"]
+    assert summary[2]["failed_genes"] == ["BRCA2", "BRCA1"]
+    with open(tmp_path / batch.SUMMARY_FILE, encoding="utf-8") as f:
+        assert json.load(f) == summary
+
+
+def test_resume_only_skips_cases_that_fully_succeeded(tmp_path, monkeypatch):
+    responses = {"TP53": [], "BRCA1": ERROR, "BRCA2": None}
+    calls = _fake_pipeline(monkeypatch, responses)
+    cases = [_case("ok", ["TP53"]), _case("partial", ["TP53", "BRCA1"]), _case("error", ["BRCA2"])]
+    run_batch(cases, str(tmp_path), workers=1)
+
+    responses.update(BRCA1=[], BRCA2=[])
+    calls.clear()
+    summary = run_batch(cases, str(tmp_path), workers=1)
+
+    assert sorted(calls) == [["BRCA2"], ["TP53", "BRCA1"]]
+    assert [record["status"] for record in summary] == ["ok", "ok", "ok"]
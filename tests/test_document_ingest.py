@@ -0,0 +1,22 @@
+from document_ingest import MentionIndex, scan_document
+
+REPORT = (b"Patient: JOHN SMITH  Ordering physician: JANE DOE  Accession AB12345\n"
+          b"Sequenced on ILLUMINA NOVASEQ. BRCA1 c.68_69delAG (rs80357914) and NM_000059.4(BRCA2):c.5946delT.")
+
+
+def test_unverified_scan_does_not_report_genes():
+    scan = scan_document(REPORT, "report.txt", index=MentionIndex())
+    assert not scan.verified
+    assert scan.genes == []
+    assert "JOHN" in scan.candidates and "BRCA1" in scan.candidates
+    assert scan.rsids == ["rs80357914"]
+
+
+def test_verified_scan_only_reports_known_symbols():
+    index = MentionIndex({"BRCA1", "BRCA2"}, {"BRCC1": "BRCA1"})
+    scan = scan_document(REPORT + b"\nSee also BRCC1.", "report.txt", index=index)
+    assert scan.verified
+    assert scan.genes == ["BRCA1", "BRCA2"]
+    assert scan.gene_counts["BRCA1"] == 2
+    assert scan.candidates == []
+    assert "NM_000059.4(BRCA2):c.5946delT" in scan.hgvs
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+import pytest
+from llm_client import ResponseCache, stream_chat_response
+
+
+class StubClient:
+    """
+    Groq client stand-in that streams a fixed answer and counts the calls.
+    """
+
+    def __init__(self, chunks=("Likely ", "pathogenic", "."), fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.calls = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, messages, model, stream=True):
+        self.calls.append(messages)
+        for i, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and i == self.fail_after:
+                raise ConnectionError("stream dropped")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))])
+
+
+def _ask(client, question, context, cache):
+    return "".join(stream_chat_response(client, question, context, cache=cache))
+
+
+def test_identical_question_is_answered_from_the_cache():
+    client, cache = StubClient(), ResponseCache()
+
+    assert _ask(client, "Is rs1 pathogenic?", "BRCA1 rs1", cache) == "Likely pathogenic."
+    assert _ask(client, "  Is rs1 pathogenic? ", "BRCA1 rs1", cache) == "Likely pathogenic."
+
+    assert len(client.calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_different_context_calls_the_client():
+    client, cache = StubClient(), ResponseCache()
+
+    _ask(client, "Is rs1 pathogenic?", "BRCA1 rs1", cache)
+    _ask(client, "Is rs1 pathogenic?", "BRCA1 rs1 rs2", cache)
+
+    assert len(client.calls) == 2
+    assert len(cache) == 2
+
+
+def test_least_recently_used_answer_is_evicted():
+    client, cache = StubClient(), ResponseCache(max_entries=2)
+
+    _ask(client, "q1", "ctx", cache)
+    _ask(client, "q2", "ctx", cache)
+    _ask(client, "q1", "ctx", cache)  # q1 is now the most recently used
+    _ask(client, "q3", "ctx", cache)
+    assert len(cache) == 2
+    assert len(client.calls) == 3
+
+    _ask(client, "q1", "ctx", cache)
+    assert len(client.calls) == 3
+    _ask(client, "q2", "ctx", cache)
+    assert len(client.calls) == 4
+
+
+def test_abandoned_stream_is_not_cached():
+    client, cache = StubClient(), ResponseCache()
+
+    stream = stream_chat_response(client, "q", "ctx", cache=cache)
+    assert next(stream) == "Likely "
+    stream.close()
+
+    assert len(cache) == 0
+    assert _ask(client, "q", "ctx", cache) == "Likely pathogenic."
+    assert len(client.calls) == 2
+
+
+def test_failed_stream_is_not_cached():
+    client, cache = StubClient(fail_after=2), ResponseCache()
+
+    with pytest.raises(ConnectionError):
+        _ask(client, "q", "ctx", cache)
+
+    assert len(cache) == 0
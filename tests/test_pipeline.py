@@ -0,0 +1,58 @@
+import json
+import pipeline
+from api_cache import get_cache
+from variant_stream import OVERLAP_REGION_URL
+from conftest import seed_gene
+
+
+def test_offline_argument_overrides_the_shared_cache_flag(monkeypatch):
+    cache = get_cache()
+    monkeypatch.setattr(cache, "offline", False)
+    calls = []
+    monkeypatch.setattr(pipeline, "post_json", lambda url, **kwargs: calls.append(url))
+
+    genes_data, missing = pipeline.fetch_genes_data(["TP53"], offline=True)
+
+    assert (genes_data, missing) == ([], ["TP53"])
+    assert calls == []
+    assert cache.offline is False
+
+
+def test_offline_panel_is_served_from_the_cache():
+    seed_gene("TP53", "ENSG00000141510", "17", 7661779, 7687538, [
+        {"id": "rs1", "seq_region_name": "17", "start": 7661800, "end": 7661800, "alleles": ["C", "T"],
+         "consequence_type": "stop_gained"},
+    ])
+    genes_data, missing = pipeline.fetch_genes_data(["TP53"], 5, ["stop_gained"], offline=True)
+    assert missing == []
+    assert [mutation["Variation"] for mutation in genes_data[0][2]] == ["rs1"]
+
+
+def test_failed_genes_lists_unresolved_genes_and_failed_variant_fetches():
+    seed_gene("TP53", "ENSG00000141510", "17", 7661779, 7687538, [])
+    # BRCA1 resolves, but its overlap response is not in the cache.
+    cache = get_cache()
+    cache.set("ensembl_lookup", {"key": "BRCA1"}, json.dumps({
+        "display_name": "BRCA1", "id": "ENSG00000012048", "seq_region_name": "17", "start": 43044295, "end": 43125483,
+    }))
+
+    genes_data, missing = pipeline.fetch_genes_data(["TP53", "BRCA1", "NOTAGENE"], 5, ["stop_gained"], offline=True)
+
+    assert missing == ["NOTAGENE"]
+    assert pipeline.failed_genes(genes_data, missing) == ["NOTAGENE", "BRCA1"]
+    assert pipeline.failed_genes(genes_data[:1], []) == []
+
+
+def test_stream_with_a_missing_sub_region_is_a_fetch_error():
+    gene_info = {"Gene ID": "ENSG00000141510", "Chromosome": "17", "Start": 1, "End": 200}
+    first_window = OVERLAP_REGION_URL.format(chromosome="17", start=1, end=100)
+    get_cache().set("ensembl_overlap", {"url": first_window, "params": None}, json.dumps([
+        {"id": "rs1", "seq_region_name": "17", "start": 50, "end": 50, "alleles": ["C", "T"],
+         "consequence_type": ["missense_variant"]},
+    ]))
+
+    mutations = pipeline.get_filtered_mutation_data_ensembl(
+        "TP53", 5, ["missense_variant"], gene_info=gene_info, stream=True, region_size=100, offline=True
+    )
+
+    assert mutations == "Error fetching mutation data from Ensembl."
@@ -0,0 +1,27 @@
+import pymupdf
+from pipeline import fetch_genes_data
+from report import generate_report
+from conftest import seed_gene
+
+
+def _variants(count, start):
+    return [
+        {"id": f"rs{start + i}", "seq_region_name": "17", "start": start + i, "end": start + i,
+         "alleles": ["C", "T"], "consequence_type": "stop_gained" if i % 2 else "missense_variant"}
+        for i in range(count)
+    ]
+
+
+def test_parallel_report_renders_pipeline_output():
+    seed_gene("TP53", "ENSG00000141510", "17", 7661779, 7687538, _variants(40, 7661800))
+    seed_gene("BRCA1", "ENSG00000012048", "17", 43044295, 43125483, _variants(40, 43044300))
+
+    genes_data, missing = fetch_genes_data(["TP53", "BRCA1"], 10, ["stop_gained", "missense_variant"])
+    assert missing == []
+    assert all(not isinstance(mutations, str) for _, _, mutations in genes_data)
+
+    pdf = generate_report(genes_data, workers=2)
+    with pymupdf.open(stream=pdf, filetype="pdf") as doc:
+        text = "".join(page.get_text() for page in doc)
+    assert "TP53" in text and "BRCA1" in text
+    assert "rs7661801" in text
@@ -0,0 +1,165 @@
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from request_scheduler import CircuitBreaker, CircuitOpenError, RequestScheduler
+
+
+class StubServer:
+    """
+    Local HTTP server that answers each request with the next scripted
+    (status, headers) pair, falling back to 200 once the script runs out, and
+    records when every request arrived.
+    """
+
+    def __init__(self):
+        self.script = deque()
+        self.arrivals = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.arrivals.append(time.monotonic())
+                status, headers = stub.script.popleft() if stub.script else (200, {})
+                body = b'{"ok": true}'
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = f"127.0.0.1:{self.server.server_address[1]}"
+        self.url = f"http://{self.host}/lookup"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def respond(self, *responses):
+        self.script.extend(responses)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def scheduler(stub):
+    session = requests.Session()
+    yield RequestScheduler(session, rates={stub.host: 1000.0}, max_retries=3, backoff_base=0.01, backoff_cap=0.05)
+    session.close()
+
+
+def test_retry_after_pauses_the_host_before_retrying(stub, scheduler):
+    stub.respond((429, {"Retry-After": "0.4"}))
+
+    response = scheduler.request("GET", stub.url)
+
+    assert response.status_code == 200
+    assert len(stub.arrivals) == 2
+    assert stub.arrivals[1] - stub.arrivals[0] >= 0.35
+    stats = scheduler.stats()[stub.host]
+    assert (stats["throttled"], stats["retries"]) == (1, 1)
+
+
+def test_exhausted_rate_limit_window_delays_the_next_request(stub, scheduler):
+    stub.respond((200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0.4"}))
+
+    assert scheduler.request("GET", stub.url).status_code == 200
+    assert scheduler.request("GET", stub.url).status_code == 200
+
+    assert stub.arrivals[1] - stub.arrivals[0] >= 0.35
+
+
+def test_server_errors_are_retried(stub, scheduler):
+    stub.respond((503, {}), (502, {}))
+
+    response = scheduler.request("GET", stub.url)
+
+    assert response.status_code == 200
+    assert len(stub.arrivals) == 3
+    assert scheduler.stats()[stub.host]["retries"] == 2
+
+
+def test_last_server_error_is_returned_when_retries_run_out(stub, scheduler):
+    stub.respond(*[(500, {})] * 4)
+
+    response = scheduler.request("GET", stub.url)
+
+    assert response.status_code == 500
+    assert len(stub.arrivals) == 4
+
+
+def test_circuit_opens_and_lets_one_trial_through_after_reset_timeout(stub, scheduler):
+    scheduler.max_retries = 0
+    state = scheduler.host_state(stub.host)
+    state.breaker = CircuitBreaker(threshold=2, reset_timeout=0.3)
+    stub.respond((500, {}), (500, {}))
+
+    assert scheduler.request("GET", stub.url).status_code == 500
+    assert scheduler.request("GET", stub.url).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        scheduler.request("GET", stub.url)
+    assert len(stub.arrivals) == 2
+    assert scheduler.stats()[stub.host]["circuit_open"]
+
+    time.sleep(0.35)
+    assert state.breaker.allow()
+    assert not state.breaker.allow()  # only one trial while it is in flight
+    state.breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        scheduler.request("GET", stub.url)
+
+    time.sleep(0.35)
+    assert scheduler.request("GET", stub.url).status_code == 200
+    assert not scheduler.stats()[stub.host]["circuit_open"]
+    assert len(stub.arrivals) == 3
+
+
+def test_throttled_trial_request_reopens_the_circuit(stub, scheduler):
+    scheduler.max_retries = 0
+    state = scheduler.host_state(stub.host)
+    state.breaker = CircuitBreaker(threshold=2, reset_timeout=0.3)
+    stub.respond((500, {}), (500, {}), (429, {}))
+
+    scheduler.request("GET", stub.url)
+    scheduler.request("GET", stub.url)
+    time.sleep(0.35)
+    assert scheduler.request("GET", stub.url).status_code == 429
+    with pytest.raises(CircuitOpenError):
+        scheduler.request("GET", stub.url)
+    assert len(stub.arrivals) == 3
+
+    time.sleep(0.35)
+    assert scheduler.request("GET", stub.url).status_code == 200
+    assert not scheduler.stats()[stub.host]["circuit_open"]
+
+
+def test_concurrency_limit_halves_on_throttling_and_grows_back(stub, scheduler):
+    scheduler.max_retries = 0
+    limiter = scheduler.host_state(stub.host).limiter
+    assert limiter.limit == limiter.max_limit == 8
+    stub.respond(*[(429, {})] * 3)
+
+    for expected in (4, 2, 1):
+        assert scheduler.request("GET", stub.url).status_code == 429
+        assert limiter.limit == expected
+
+    scheduler.request("GET", stub.url)
+    assert limiter.limit == 2
+
+    for _ in range(60):
+        scheduler.request("GET", stub.url)
+    assert limiter.limit == limiter.max_limit
+    assert scheduler.stats()[stub.host]["concurrency_limit"] == 8
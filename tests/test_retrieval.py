@@ -0,0 +1,26 @@
+from retrieval import BM25Index, ContextRetriever
+
+
+def _gene(symbol, summary, variants):
+    gene_info = {"Gene Symbol": symbol, "Gene ID": f"ENSG_{symbol}", "Chromosome": "17", "Start": 1, "End": 1000,
+                 "Description": f"{symbol} gene"}
+    gene_function = {"summary": summary}
+    mutations = [{"Variation": variant_id, "Location": "17", "Allele": "C/T", "Consequence": "stop_gained"}
+                 for variant_id in variants]
+    return gene_info, gene_function, mutations
+
+
+def test_tied_scores_within_a_gene_do_not_compare_doc_ids():
+    retriever = ContextRetriever()
+    retriever.set_genes([_gene("BRCA1", "DNA repair and tumour suppression", ["rs1"])])
+    context = retriever.context_for("What about BRCA1?")
+    assert context is not None
+    assert retriever.report["chunks"] == 2
+
+
+def test_search_ranks_by_score_and_keeps_indexing_order_on_ties():
+    index = BM25Index()
+    index.add(("a", "summary"), "brca1 repair")
+    index.add(("a", 0), "brca1 repair")
+    index.add(("b", 1), "tp53")
+    assert [doc_id for _, doc_id in index.search("brca1 repair", 5)] == [("a", "summary"), ("a", 0)]
@@ -0,0 +1,112 @@
+import time
+import threading
+import pytest
+from shared_store import SharedStore
+
+THREADS = 8
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _run_concurrently(store, compute, **kwargs):
+    """
+    Call store.get("key", compute) from THREADS threads while compute is held
+    until every other thread is waiting on it. Returns each thread's result or
+    the exception it raised.
+    """
+    release = threading.Event()
+    outcomes = [None] * THREADS
+
+    def held():
+        release.wait(5)
+        return compute()
+
+    def worker(number):
+        try:
+            outcomes[number] = store.get("key", held, **kwargs)
+        except Exception as e:
+            outcomes[number] = e
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: store.stats()["coalesced"] == THREADS - 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_concurrent_gets_share_one_compute():
+    store = SharedStore()
+    calls = []
+
+    outcomes = _run_concurrently(store, lambda: calls.append(1) or "value")
+
+    assert outcomes == ["value"] * THREADS
+    assert len(calls) == 1
+    assert store.get("key", lambda: pytest.fail("must be served from the store")) == "value"
+    assert store.stats() == {"entries": 1, "hits": 1, "coalesced": THREADS - 1, "computed": 1,
+                             "upstream_calls_saved": THREADS}
+
+
+def test_failures_reach_every_waiter_and_are_not_stored():
+    store = SharedStore()
+    error = ValueError("upstream failed")
+
+    def fail():
+        raise error
+
+    outcomes = _run_concurrently(store, fail)
+
+    assert all(outcome is error for outcome in outcomes)
+    assert store.stats()["entries"] == 0
+    assert store.get("key", lambda: "retried") == "retried"
+
+
+def test_uncacheable_values_are_shared_but_not_stored():
+    store = SharedStore()
+    calls = []
+
+    outcomes = _run_concurrently(store, lambda: calls.append(1) or "Error", cacheable=lambda value: value != "Error")
+
+    assert outcomes == ["Error"] * THREADS
+    assert len(calls) == 1
+    assert store.stats()["entries"] == 0
+    assert store.get("key", lambda: "value") == "value"
+
+
+def test_get_many_only_computes_missing_keys():
+    store = SharedStore()
+    store.get("a", lambda: 1)
+    requested = []
+
+    def compute_many(keys):
+        requested.append(keys)
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    assert store.get_many(["a", "b", "missing"], compute_many) == {"a": 1, "b": "B"}
+    assert requested == [["b", "missing"]]
+
+
+def test_least_recently_used_entries_are_evicted():
+    store = SharedStore(max_entries=2)
+    store.get("a", lambda: 1)
+    store.get("b", lambda: 2)
+    store.get("a", lambda: pytest.fail("a is stored"))
+    store.get("c", lambda: 3)
+
+    assert store.get("a", lambda: "recomputed") == 1
+    assert store.get("b", lambda: "recomputed") == "recomputed"
+
+
+def test_entries_expire_after_the_ttl():
+    store = SharedStore(ttl=-1)
+    store.get("a", lambda: 1)
+
+    assert store.get("a", lambda: 2) == 2
@@ -0,0 +1,107 @@
+import io
+import csv
+import pytest
+import requests
+import pipeline
+import variant_catalogue
+from variant_catalogue import VariantCatalogue, catalogue_store, get_catalogue, load_catalogue
+
+GENE_INFO = {"Gene ID": "ENSG00000141510", "Chromosome": "17", "Start": 1000, "End": 3999}
+
+
+def _variant(position, consequence="missense_variant", length=1):
+    return {"id": f"rs{position}", "seq_region_name": "17", "start": position, "end": position + length - 1,
+            "alleles": ["A", "G"], "consequence_type": [consequence]}
+
+
+WINDOWS = {
+    1000: [_variant(990, length=20), _variant(1500, "stop_gained"), _variant(1990, length=20)],
+    2000: [_variant(1990, length=20), _variant(2500)],
+    3000: [_variant(3100, "stop_gained"), _variant(3200)],
+}
+
+
+def _truncated(records):
+    yield from records
+    raise requests.exceptions.ChunkedEncodingError("connection broken")
+
+
+@pytest.fixture
+def regions(monkeypatch):
+    responses = dict(WINDOWS)
+    monkeypatch.setattr(pipeline, "get_gene_info_ensembl", lambda gene, offline=None: GENE_INFO)
+    monkeypatch.setattr(variant_catalogue, "open_region",
+                        lambda chromosome, start, end, stats, offline=None: responses.get(start))
+    catalogue_store.clear()
+    yield responses
+    catalogue_store.clear()
+
+
+def test_windows_are_joined_in_position_order_without_duplicates(regions):
+    catalogue = load_catalogue("TP53", region_size=1000)
+
+    assert catalogue.complete and catalogue.windows == 3
+    assert catalogue.rows(catalogue.select())["variant_id"] == ["rs990", "rs1500", "rs1990", "rs2500", "rs3100", "rs3200"]
+    assert catalogue.rows(catalogue.select(["stop"]))["variant_id"] == ["rs1500", "rs3100"]
+    assert catalogue.page(catalogue.select(), 1, 4)["variant_id"] == ["rs3100", "rs3200"]
+
+
+def test_a_window_that_fails_while_reading_is_recorded(regions):
+    regions[2000] = _truncated(WINDOWS[2000][:1])
+
+    catalogue = load_catalogue("TP53", region_size=1000)
+
+    assert catalogue.missing_windows == [(2000, 2999)]
+    assert catalogue.rows(catalogue.select())["variant_id"] == ["rs990", "rs1500", "rs1990", "rs3100", "rs3200"]
+
+
+def test_a_window_that_cannot_be_opened_is_recorded(regions):
+    regions[3000] = None
+
+    catalogue = load_catalogue("TP53", region_size=1000)
+
+    assert catalogue.missing_windows == [(3000, 3999)]
+    assert len(catalogue) == 4
+
+
+def test_incomplete_catalogues_are_not_kept(regions):
+    regions[3000] = None
+    assert not get_catalogue("TP53", region_size=1000).complete
+
+    regions[3000] = WINDOWS[3000]
+    assert get_catalogue("TP53", region_size=1000).complete
+    assert get_catalogue("TP53", region_size=1000) is get_catalogue("TP53", region_size=1000)
+
+
+def _catalogue(count):
+    catalogue = VariantCatalogue("TTN", "2", 1, count)
+    catalogue.add_window(1, [_variant(position, "stop_gained" if position % 3 else "intron_variant")
+                             for position in range(1, count + 1)])
+    return catalogue.finish()
+
+
+def test_csv_export_is_written_in_batches():
+    catalogue = _catalogue(2500)
+    rows = catalogue.select(["stop_gained"])
+
+    chunks = list(catalogue.iter_csv(rows, batch_rows=1000))
+
+    assert len(chunks) == 2
+    table = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert table[0] == list(variant_catalogue.COLUMNS)
+    assert len(table) == len(rows) + 1
+    assert table[1] == ["rs1", "2", "1", "1", "A/G", "stop_gained"]
+
+
+def test_parquet_export_has_one_row_group_per_batch():
+    pq = pytest.importorskip("pyarrow.parquet")
+    catalogue = _catalogue(2500)
+    rows = catalogue.select()
+
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(catalogue.iter_parquet(rows, batch_rows=1000))))
+
+    assert parquet.metadata.num_rows == 2500
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column("variant_id")[2499].as_py() == "rs2500"
+    assert table.column("consequence")[2].as_py() == "intron_variant"
@@ -0,0 +1,122 @@
+import os
+import gzip
+import shutil
+import pytest
+import pipeline
+import variant_index
+from variant_index import VariantIndex, build_index
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+VCF = os.path.join(FIXTURES, "variants.vcf")
+GFF3 = os.path.join(FIXTURES, "variants.gff3")
+
+
+@pytest.fixture
+def vcf_index(tmp_path):
+    build_index(VCF, str(tmp_path))
+    return VariantIndex(str(tmp_path))
+
+
+def _ids(index, chromosome, start, end, filter_terms=None):
+    return [record["id"] for record in index.iter_overlap(chromosome, start, end, filter_terms)]
+
+
+def test_build_records_rows_and_chromosomes(vcf_index):
+    assert vcf_index.rows == 6
+    assert set(vcf_index.chromosomes) == {"13", "17"}
+
+
+def test_overlap_finds_long_variants_that_start_before_the_region(vcf_index):
+    # rs101 is a 21-base deletion at 43044350-43044370; only max_span brings it into range.
+    assert _ids(vcf_index, "17", 43044360, 43044390) == ["rs101", "rs102"]
+    assert _ids(vcf_index, "17", 43044371, 43044390) == ["rs102"]
+    assert _ids(vcf_index, "17", 43044301, 43044349) == []
+
+
+def test_records_have_the_overlap_endpoint_shape(vcf_index):
+    records = list(vcf_index.iter_overlap("17", 43044350, 43044400))
+    assert records[0] == {
+        "id": "rs101", "seq_region_name": "17", "start": 43044350, "end": 43044370,
+        "allele_string": "ACGTACGTACGTACGTACGTA/A",
+        "consequence_type": ["frameshift_variant", "splice_region_variant"],
+    }
+    assert records[1]["allele_string"] == "G/A/C"
+    assert records[1]["consequence_type"] == ["missense_variant", "synonymous_variant"]
+    assert records[2]["id"] == "17_43044400_T_G"
+    assert records[2]["consequence_type"] == ["intron_variant"]
+
+
+def test_chr_prefix_is_normalized(vcf_index):
+    assert _ids(vcf_index, "chr17", 43044300, 43044300) == ["rs100"]
+    assert _ids(vcf_index, "17", 43044300, 43044300) == ["rs100"]
+    assert _ids(vcf_index, "CHR13", 32315000, 32316000) == ["rs2000"]
+    assert _ids(vcf_index, "chrX", 1, 10 ** 9) == []
+
+
+def test_consequence_filters(vcf_index):
+    everything = (43044000, 43045000)
+    assert _ids(vcf_index, "17", *everything, ["stop_gained"]) == ["rs100"]
+    assert _ids(vcf_index, "17", *everything, ["missense_variant"]) == ["rs102", "rs104"]
+    # Substring matching, like the REST filter loop: "splice" matches splice_region_variant.
+    assert _ids(vcf_index, "17", *everything, ["splice"]) == ["rs101"]
+    assert _ids(vcf_index, "17", *everything, ["stop_gained", "intron_variant"]) == ["rs100", "17_43044400_T_G"]
+    assert _ids(vcf_index, "17", *everything, ["transcript_ablation"]) == []
+
+
+def test_gzipped_input(tmp_path):
+    source = tmp_path / "variants.vcf.gz"
+    with open(VCF, "rb") as f, gzip.open(source, "wb") as out:
+        shutil.copyfileobj(f, out)
+    build_index(str(source), str(tmp_path / "index"))
+    assert VariantIndex(str(tmp_path / "index")).rows == 6
+
+
+def test_gff3_input(tmp_path):
+    build_index(GFF3, str(tmp_path))
+    index = VariantIndex(str(tmp_path))
+    records = list(index.iter_overlap("chr17", 43044360, 43044390))
+    assert [record["id"] for record in records] == ["rs101", "rs102"]
+    assert records[0]["end"] == 43044370
+    assert records[0]["allele_string"] == "CGTACGTACGTACGTACGTA/-"
+    assert records[0]["consequence_type"] == ["frameshift_variant", "splice_region_variant"]
+    assert records[1]["allele_string"] == "G/A/C"
+
+
+def _vcf(tmp_path, rows):
+    path = tmp_path / "input.vcf"
+    lines = ["#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO"]
+    lines += [f"{chromosome}\t{position}\t{variant_id}\tA\tG\t.\t.\tVE=missense_variant"
+              for chromosome, position, variant_id in rows]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_unsorted_input_is_rejected(tmp_path):
+    source = _vcf(tmp_path, [("17", 200, "rs2"), ("17", 100, "rs1")])
+    with pytest.raises(ValueError, match="not sorted"):
+        build_index(source, str(tmp_path / "index"))
+
+
+def test_ungrouped_input_is_rejected(tmp_path):
+    source = _vcf(tmp_path, [("17", 100, "rs1"), ("13", 100, "rs2"), ("chr17", 200, "rs3")])
+    with pytest.raises(ValueError, match="not grouped"):
+        build_index(source, str(tmp_path / "index"))
+
+
+def test_pipeline_reads_variants_from_the_index(tmp_path, monkeypatch):
+    build_index(VCF, str(tmp_path))
+    monkeypatch.setattr(variant_index, "VARIANT_INDEX_PATH", str(tmp_path))
+
+    def no_rest(*args, **kwargs):
+        raise AssertionError("the overlap endpoint must not be called when an index is configured")
+
+    monkeypatch.setattr(pipeline, "cached_get_json", no_rest)
+    monkeypatch.setattr(pipeline, "open_variant_stream", no_rest)
+    gene_info = {"Gene ID": "ENSG00000012048", "Chromosome": "17", "Start": 43044295, "End": 43125483}
+
+    mutations = pipeline.get_filtered_mutation_data_ensembl(
+        "BRCA1", 5, ["stop_gained", "missense_variant"], gene_info=gene_info, offline=True
+    )
+
+    assert [mutation["Variation"] for mutation in mutations] == ["rs100", "rs102", "rs104"]
+    assert mutations[0] == {"Variation": "rs100", "Location": "17", "Allele": "C/T", "Consequence": "stop_gained"}
@@ -0,0 +1,451 @@
+import os
+import io
+import csv
+import sys
+import secrets
+import argparse
+import threading
+import importlib.util
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import requests
+from variant_table import CONSEQUENCES
+from variant_stream import VariantFetchStats, open_region
+from variant_index import get_variant_index
+from metrics import Span, span
+from shared_store import SharedStore
+
+
+CATALOGUE_REGION_SIZE = int(os.getenv("VARIANTOR_CATALOGUE_REGION_SIZE", "100000"))
+CATALOGUE_STORE_SIZE = int(os.getenv("VARIANTOR_CATALOGUE_STORE_SIZE", "8"))
+EXPORT_PORT = int(os.getenv("VARIANTOR_EXPORT_PORT", "0"))
+EXPORT_URL = os.getenv("VARIANTOR_EXPORT_URL", "")
+EXPORT_INLINE_MAX_ROWS = int(os.getenv("VARIANTOR_EXPORT_INLINE_MAX_ROWS", "50000"))
+EXPORT_BATCH_ROWS = 20000
+# pyarrow is optional; Parquet is only offered when it is installed.
+EXPORT_FORMATS = ("csv", "parquet") if importlib.util.find_spec("pyarrow") else ("csv",)
+MAX_EXPORTS = 32
+
+COLUMNS = ("variant_id", "chromosome", "start", "end", "alleles", "consequence")
+
+
+def _record_alleles(record):
+    allele_string = record.get("allele_string", "N/A")
+    if allele_string == "N/A":
+        allele_string = record.get("alleles", "N/A")
+    if isinstance(allele_string, list):
+        allele_string = '/'.join(allele_string)
+    return allele_string
+
+
+def _record_consequences(record):
+    consequence_type = record.get("consequence_type", [])
+    if isinstance(consequence_type, str):
+        consequence_type = [consequence_type]
+    return consequence_type
+
+
+class _Pool:
+    """
+    Interns repeated strings (allele and consequence strings) as integer codes.
+    """
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class VariantCatalogue:
+    """
+    Every variant overlapping one gene, in position order, stored column by column:
+    32-bit start/end, variant ids packed into one UTF-8 blob with offsets, pooled
+    allele and consequence strings as integer codes, and a consequence bitmask per
+    variant. Variants are added one retrieval window at a time and the windows are
+    joined into contiguous arrays by finish(); rows are only turned back into
+    Python values for the slice that is displayed or exported.
+    """
+
+    def __init__(self, gene, chromosome, start, end, index=CONSEQUENCES):
+        self.gene = gene
+        self.chromosome = str(chromosome)
+        self.start = int(start)
+        self.end = int(end)
+        self.index = index
+        self.alleles = _Pool()
+        self.consequences = _Pool()
+        self.windows = 0
+        self.missing_windows = []
+        self.fetch_stats = None
+        self._chunks = []
+        self._columns = None
+
+    def add_window(self, window_start, records):
+        """
+        Pack the variants of one window. A variant spanning a window boundary is
+        returned for both windows, so after the first window only variants that
+        start inside it are kept. Nothing is added if reading the records fails.
+        """
+        first = window_start <= self.start
+        records = sorted(
+            (record for record in records if first or (record.get("start") or 0) >= window_start),
+            key=lambda record: record.get("start") or 0,
+        )
+        if not records:
+            return 0
+
+        ids = [str(record.get("id", "N/A")).encode("utf-8") for record in records]
+        id_lengths = np.fromiter((len(variant_id) for variant_id in ids), dtype=np.int64, count=len(ids))
+        consequence_types = [_record_consequences(record) for record in records]
+        self._chunks.append({
+            "starts": np.fromiter((record.get("start") or 0 for record in records), dtype=np.int32, count=len(records)),
+            "ends": np.fromiter((record.get("end") or 0 for record in records), dtype=np.int32, count=len(records)),
+            "id_lengths": id_lengths,
+            "id_blob": b"".join(ids),
+            "alleles": np.fromiter((self.alleles.code(_record_alleles(record)) for record in records),
+                                   dtype=np.int32, count=len(records)),
+            "consequences": np.fromiter((self.consequences.code('/'.join(terms)) for terms in consequence_types),
+                                        dtype=np.int32, count=len(records)),
+            "masks": np.fromiter((self.index.mask(terms) for terms in consequence_types),
+                                 dtype=np.uint64, count=len(records)),
+        })
+        return len(records)
+
+    def finish(self):
+        chunks, self._chunks = self._chunks, []
+        columns = {}
+        for name, dtype in (("starts", np.int32), ("ends", np.int32), ("alleles", np.int32),
+                            ("consequences", np.int32), ("masks", np.uint64)):
+            columns[name] = np.concatenate([chunk[name] for chunk in chunks]) if chunks else np.zeros(0, dtype=dtype)
+        id_lengths = np.concatenate([chunk["id_lengths"] for chunk in chunks]) if chunks else np.zeros(0, dtype=np.int64)
+        columns["id_offsets"] = np.concatenate(([0], np.cumsum(id_lengths))).astype(np.int64)
+        columns["id_blob"] = np.frombuffer(b"".join(chunk["id_blob"] for chunk in chunks), dtype=np.uint8)
+        self._columns = columns
+        return self
+
+    def __len__(self):
+        return len(self._columns["starts"]) if self._columns is not None else 0
+
+    @property
+    def complete(self):
+        return not self.missing_windows
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self._columns.values()) if self._columns is not None else 0
+
+    def count_by_term(self):
+        masks = self._columns["masks"]
+        counts = {term: int(np.count_nonzero(masks & np.uint64(bit))) for term, bit in self.index.bits.items()}
+        return {term: count for term, count in counts.items() if count}
+
+    def select(self, consequences=None):
+        """
+        Row numbers of the variants matching any of the consequence filters (same
+        substring rule as the panel filter), or of every variant when none are given.
+        """
+        if not consequences:
+            return np.arange(len(self))
+        mask = 0
+        for consequence in consequences:
+            mask |= self.index.filter_mask(consequence)
+        return np.flatnonzero(self._columns["masks"] & np.uint64(mask))
+
+    def _ids(self, rows):
+        blob, offsets = self._columns["id_blob"], self._columns["id_offsets"]
+        return [bytes(blob[offsets[row]:offsets[row + 1]]).decode("utf-8") for row in rows]
+
+    def rows(self, rows):
+        """
+        Column name to list of values for the given row numbers only.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        columns = self._columns
+        return {
+            "variant_id": self._ids(rows),
+            "chromosome": [self.chromosome] * len(rows),
+            "start": columns["starts"][rows].tolist(),
+            "end": columns["ends"][rows].tolist(),
+            "alleles": [self.alleles.values[code] for code in columns["alleles"][rows].tolist()],
+            "consequence": [self.consequences.values[code] for code in columns["consequences"][rows].tolist()],
+        }
+
+    def page(self, rows, number, size):
+        """
+        One page (numbered from 0) of the selected rows.
+        """
+        return self.rows(rows[number * size:(number + 1) * size])
+
+    def iter_csv(self, rows, batch_rows=EXPORT_BATCH_ROWS):
+        """
+        Yield the selected rows as UTF-8 CSV, one encoded batch at a time.
+        """
+        with Span("catalogue_export", track=False, gene=self.gene, format="csv") as stage:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(COLUMNS)
+            for i in range(0, len(rows), batch_rows):
+                batch = self.rows(rows[i:i + batch_rows])
+                writer.writerows(zip(*(batch[column] for column in COLUMNS)))
+                chunk = buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+                stage.add(bytes=len(chunk), items=len(batch["start"]))
+                yield chunk
+            chunk = buffer.getvalue().encode("utf-8")
+            stage.add(bytes=len(chunk))
+            if chunk:
+                yield chunk
+
+    def iter_parquet(self, rows, batch_rows=EXPORT_BATCH_ROWS):
+        """
+        Yield the selected rows as a Parquet file, one row group per batch. Alleles
+        and consequences are written as dictionary columns straight from the pools.
+        """
+        import pyarrow as pa  # optional, only needed for Parquet exports
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("variant_id", pa.string()),
+            ("chromosome", pa.string()),
+            ("start", pa.int32()),
+            ("end", pa.int32()),
+            ("alleles", pa.dictionary(pa.int32(), pa.string())),
+            ("consequence", pa.dictionary(pa.int32(), pa.string())),
+        ])
+        alleles = pa.array(self.alleles.values, type=pa.string())
+        consequences = pa.array(self.consequences.values, type=pa.string())
+        columns = self._columns
+
+        with Span("catalogue_export", track=False, gene=self.gene, format="parquet") as stage:
+            sink = _ChunkSink()
+            with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+                for i in range(0, len(rows), batch_rows):
+                    batch = np.asarray(rows[i:i + batch_rows], dtype=np.intp)
+                    writer.write_table(pa.table([
+                        pa.array(self._ids(batch), type=pa.string()),
+                        pa.array([self.chromosome] * len(batch), type=pa.string()),
+                        pa.array(columns["starts"][batch]),
+                        pa.array(columns["ends"][batch]),
+                        pa.DictionaryArray.from_arrays(pa.array(columns["alleles"][batch]), alleles),
+                        pa.DictionaryArray.from_arrays(pa.array(columns["consequences"][batch]), consequences),
+                    ], schema=schema))
+                    chunk = sink.take()
+                    stage.add(bytes=len(chunk), items=len(batch))
+                    if chunk:
+                        yield chunk
+            chunk = sink.take()
+            stage.add(bytes=len(chunk))
+            if chunk:
+                yield chunk
+
+    def iter_export(self, rows, export_format):
+        if export_format == "parquet":
+            return self.iter_parquet(rows)
+        return self.iter_csv(rows)
+
+
+class _ChunkSink:
+    """
+    Write-only file object for ParquetWriter that hands written bytes back in
+    pieces instead of keeping the whole file.
+    """
+
+    def __init__(self):
+        self.closed = False
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        chunk = b"".join(self._parts)
+        self._parts.clear()
+        return chunk
+
+
+def iter_windows(start, end, region_size=CATALOGUE_REGION_SIZE):
+    for window_start in range(int(start), int(end) + 1, region_size):
+        yield window_start, min(window_start + region_size - 1, int(end))
+
+
+def load_catalogue(gene, region_size=CATALOGUE_REGION_SIZE, progress=None, offline=None):
+    """
+    Retrieve every variant overlapping a gene, one sub-region of region_size bases
+    at a time, from the local variant index when one is configured and otherwise
+    from the Ensembl overlap endpoint (through the API cache). A window that fails
+    (whether the request or reading its body fails) is recorded in missing_windows
+    and the rest are still fetched. progress(done,
+    total) is called after every window. Returns None when the gene is unknown.
+    offline overrides the cache's offline setting for this catalogue.
+    """
+    from pipeline import get_gene_info_ensembl
+
+    gene_info = get_gene_info_ensembl(gene, offline)
+    if not gene_info:
+        print(f"Gene information not found for {gene}")
+        return None
+
+    catalogue = VariantCatalogue(gene, gene_info["Chromosome"], gene_info["Start"], gene_info["End"])
+    windows = list(iter_windows(catalogue.start, catalogue.end, region_size))
+    catalogue.windows = len(windows)
+    variant_index = get_variant_index()
+    stats = VariantFetchStats()
+
+    with span("catalogue_fetch", gene=gene, windows=len(windows)) as stage:
+        for done, (window_start, window_end) in enumerate(windows, start=1):
+            if variant_index is not None:
+                records = variant_index.iter_overlap(catalogue.chromosome, window_start, window_end)
+            else:
+                records = open_region(catalogue.chromosome, window_start, window_end, stats, offline)
+            if records is None:
+                catalogue.missing_windows.append((window_start, window_end))
+            else:
+                try:
+                    catalogue.add_window(window_start, records)
+                except (requests.RequestException, ValueError) as e:
+                    print(f"Error reading variants for {gene} at {catalogue.chromosome}:{window_start}-{window_end}: {e}")
+                    catalogue.missing_windows.append((window_start, window_end))
+            if progress is not None:
+                progress(done, len(windows))
+        catalogue.finish()
+        stats.finish()
+        catalogue.fetch_stats = stats
+        stage.add(items=len(catalogue))
+
+    print(f"Catalogued {len(catalogue)} variants for {gene} in {len(windows)} window(s) "
+          f"({catalogue.nbytes / 1e6:.1f} MB): {stats.summary()}")
+    if catalogue.missing_windows:
+        print(f"Missing {len(catalogue.missing_windows)} window(s) for {gene}: {catalogue.missing_windows}")
+    return catalogue
+
+
+def _is_complete(catalogue):
+    return catalogue is not None and catalogue.complete
+
+
+# Catalogues are large, so they get their own small store instead of the per-gene one.
+catalogue_store = SharedStore(max_entries=CATALOGUE_STORE_SIZE)
+
+
+def get_catalogue(gene, region_size=CATALOGUE_REGION_SIZE, progress=None, offline=None):
+    """
+    load_catalogue shared by every session in the process; concurrent requests for
+    the same gene wait for one fetch. Unknown genes and incomplete catalogues are
+    not kept, so they are fetched again next time.
+    """
+    return catalogue_store.get(("catalogue", gene, region_size, offline),
+                               lambda: load_catalogue(gene, region_size, progress, offline), _is_complete)
+
+
+_exports = OrderedDict()
+_exports_lock = threading.Lock()
+
+
+def register_export(catalogue, rows, export_format):
+    """
+    Make an export downloadable from the export server and return its path. Only
+    the MAX_EXPORTS most recent exports stay available.
+    """
+    token = secrets.token_urlsafe(16)
+    with _exports_lock:
+        _exports[token] = (catalogue, rows, export_format)
+        while len(_exports) > MAX_EXPORTS:
+            _exports.popitem(last=False)
+    return f"/export/{token}"
+
+
+def export_url(path, port=EXPORT_PORT):
+    return f"{EXPORT_URL or f'http://localhost:{port}'}{path}"
+
+
+class _ExportHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        token = self.path.split("?")[0].rsplit("/", 1)[-1]
+        with _exports_lock:
+            export = _exports.get(token) if self.path.startswith("/export/") else None
+        if export is None:
+            self.send_error(404)
+            return
+        catalogue, rows, export_format = export
+        content_type = "application/vnd.apache.parquet" if export_format == "parquet" else "text/csv; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Disposition", f'attachment; filename="{catalogue.gene}_variants.{export_format}"')
+        self.end_headers()
+        # No Content-Length: the body is written batch by batch and ends when the connection closes.
+        for chunk in catalogue.iter_export(rows, export_format):
+            self.wfile.write(chunk)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve_exports(port=EXPORT_PORT):
+    """
+    Serve registered exports on port from a background thread, once per process.
+    Does nothing when port is 0 (VARIANTOR_EXPORT_PORT unset).
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _ExportHandler)
+            except OSError as e:
+                print(f"Could not serve exports on port {port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export every variant overlapping a gene.")
+    parser.add_argument("gene")
+    parser.add_argument("output", help="output file; .parquet writes Parquet, anything else CSV")
+    parser.add_argument("--consequence", action="append", default=[],
+                        help="only export variants with this consequence (repeatable)")
+    parser.add_argument("--region-size", type=int, default=CATALOGUE_REGION_SIZE)
+    args = parser.parse_args(argv)
+    export_format = "parquet" if args.output.endswith(".parquet") else "csv"
+    if export_format not in EXPORT_FORMATS:
+        parser.error("Parquet exports need pyarrow (pip install pyarrow)")
+
+    catalogue = load_catalogue(args.gene.upper(), args.region_size)
+    if catalogue is None:
+        return 1
+    rows = catalogue.select(args.consequence)
+    with open(args.output, "wb") as f:
+        for chunk in catalogue.iter_export(rows, export_format):
+            f.write(chunk)
+    print(f"Wrote {len(rows)} variants to {args.output}")
+    return 0 if catalogue.complete else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import threading
+from array import array
+import numpy as np
+from variant_table import ConsequenceIndex
+
+
+VARIANT_INDEX_PATH = os.getenv("VARIANTOR_VARIANT_INDEX", "")
+
+META_FILE = "meta.json"
+COLUMNS = {
+    "starts": np.int64,
+    "ends": np.int64,
+    "masks": np.uint64,
+    "consequences": np.int32,
+    "id_offsets": np.int64,
+    "allele_offsets": np.int64,
+}
+
+
+def normalize_chromosome(chromosome):
+    chromosome = str(chromosome)
+    return chromosome[3:] if chromosome.lower().startswith("chr") else chromosome
+
+
+def _open_text(path):
+    """
+    Open a plain or gzip/bgzip compressed text file.
+    """
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+    if compressed:
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def _unique(terms):
+    seen = []
+    for term in terms:
+        if term and term not in seen:
+            seen.append(term)
+    return seen
+
+
+def parse_vcf(lines):
+    """
+    Yield (chromosome, start, end, id, alleles, consequences) from a VCF. Consequences
+    are read from Ensembl's VE= field or from a VEP CSQ= field.
+    """
+    csq_position = 1
+    for line in lines:
+        if line.startswith("##"):
+            if line.startswith("##INFO=<ID=CSQ") and "Format: " in line:
+                fields = line.split("Format: ", 1)[1].split('"')[0].split("|")
+                if "Consequence" in fields:
+                    csq_position = fields.index("Consequence")
+            continue
+        if line.startswith("#") or not line.strip():
+            continue
+
+        columns = line.rstrip("\n").split("\t")
+        if len(columns) < 8:
+            continue
+        chromosome, position, variant_id, ref, alt, _, _, info = columns[:8]
+        start = int(position)
+        end = start + max(len(ref), 1) - 1
+        if variant_id == ".":
+            variant_id = f"{normalize_chromosome(chromosome)}_{position}_{ref}_{alt}"
+
+        consequences = []
+        for entry in info.split(";"):
+            if entry.startswith("VE="):
+                consequences.extend(part.split("|")[0] for part in entry[3:].split(","))
+            elif entry.startswith("CSQ="):
+                for part in entry[4:].split(","):
+                    fields = part.split("|")
+                    if len(fields) > csq_position:
+                        consequences.extend(fields[csq_position].split("&"))
+
+        alleles = "/".join([ref] + alt.split(","))
+        yield chromosome, start, end, variant_id, alleles, _unique(consequences)
+
+
+def parse_gff3(lines):
+    """
+    Yield (chromosome, start, end, id, alleles, consequences) from a GFF3/GVF variation
+    dump, reading Variant_effect, Reference_seq/Variant_seq and the dbSNP Dbxref.
+    """
+    for line in lines:
+        if line.startswith("#") or not line.strip():
+            continue
+        columns = line.rstrip("\n").split("\t")
+        if len(columns) < 9:
+            continue
+        chromosome, _, _, start, end, _, _, _, attributes = columns[:9]
+
+        attrs = {}
+        for pair in attributes.split(";"):
+            if "=" in pair:
+                key, value = pair.split("=", 1)
+                attrs[key] = value
+
+        variant_id = attrs.get("Name") or attrs.get("ID") or f"{normalize_chromosome(chromosome)}_{start}"
+        for xref in attrs.get("Dbxref", "").split(","):
+            if xref.startswith("dbSNP") and ":" in xref:
+                variant_id = xref.split(":", 1)[1]
+                break
+
+        alleles = "/".join([attrs.get("Reference_seq", "-")] + attrs.get("Variant_seq", "-").split(","))
+        consequences = [effect.split(" ")[0] for effect in attrs.get("Variant_effect", "").split(",") if effect]
+        yield chromosome, int(start), int(end), variant_id, alleles, _unique(consequences)
+
+
+def build_index(source, output_dir):
+    """
+    Build a variant index from a (bgzipped) VCF or GFF3/GVF file. The input must be
+    grouped by chromosome and sorted by position, as bgzipped/tabix-ready dumps are.
+    Columns are written straight to disk as they are parsed.
+    """
+    name = source.lower()
+    for suffix in (".gz", ".bgz"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    parser = parse_gff3 if name.endswith((".gff3", ".gff", ".gvf")) else parse_vcf
+
+    os.makedirs(output_dir, exist_ok=True)
+    consequence_index = ConsequenceIndex()
+    pool_codes = {}
+    pool = []
+    chromosomes = {}
+    files = {column: open(os.path.join(output_dir, f"{column}.bin"), "wb") for column in COLUMNS}
+    id_blob = open(os.path.join(output_dir, "ids.bin"), "wb")
+    allele_blob = open(os.path.join(output_dir, "alleles.bin"), "wb")
+
+    row = 0
+    id_offset = 0
+    allele_offset = 0
+    current = None
+    last_start = 0
+    batch = {column: array("q") for column in ("starts", "ends", "id_offsets", "allele_offsets")}
+    batch["masks"] = array("Q")
+    batch["consequences"] = array("i")
+    batch["id_offsets"].append(0)
+    batch["allele_offsets"].append(0)
+
+    def flush():
+        for column, values in batch.items():
+            values.tofile(files[column])
+            del values[:]
+
+    try:
+        with _open_text(source) as lines:
+            for chromosome, start, end, variant_id, alleles, consequences in parser(lines):
+                chromosome = normalize_chromosome(chromosome)
+                if chromosome != current:
+                    if chromosome in chromosomes:
+                        raise ValueError(f"Input is not grouped by chromosome: {chromosome} appears twice")
+                    chromosomes[chromosome] = [row, row, 0]
+                    current = chromosome
+                    last_start = 0
+                if start < last_start:
+                    raise ValueError(f"Input is not sorted by position on chromosome {chromosome} at {start}")
+                last_start = start
+
+                key = "/".join(consequences)
+                code = pool_codes.get(key)
+                if code is None:
+                    code = len(pool)
+                    pool.append(consequences)
+                    pool_codes[key] = code
+
+                encoded_id = variant_id.encode("utf-8")
+                encoded_alleles = alleles.encode("utf-8")
+                id_blob.write(encoded_id)
+                allele_blob.write(encoded_alleles)
+                id_offset += len(encoded_id)
+                allele_offset += len(encoded_alleles)
+
+                batch["starts"].append(start)
+                batch["ends"].append(end)
+                batch["masks"].append(consequence_index.mask(consequences))
+                batch["consequences"].append(code)
+                batch["id_offsets"].append(id_offset)
+                batch["allele_offsets"].append(allele_offset)
+
+                row += 1
+                chromosomes[chromosome][1] = row
+                chromosomes[chromosome][2] = max(chromosomes[chromosome][2], end - start)
+                if row % 100000 == 0:
+                    flush()
+        flush()
+    finally:
+        for f in files.values():
+            f.close()
+        id_blob.close()
+        allele_blob.close()
+
+    meta = {
+        "source": os.path.basename(source),
+        "rows": row,
+        "terms": consequence_index.terms,
+        "consequence_pool": pool,
+        "chromosomes": chromosomes,
+    }
+    with open(os.path.join(output_dir, META_FILE), "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+class VariantIndex:
+    """
+    Read-only view of a built index. Columns are memory-mapped, and an overlap query
+    is a binary search on the chromosome's sorted start positions, widened by the
+    longest variant on that chromosome.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.rows = meta["rows"]
+        self.terms = meta["terms"]
+        self.bits = {term: 1 << i for i, term in enumerate(self.terms)}
+        self.consequence_pool = meta["consequence_pool"]
+        self.chromosomes = meta["chromosomes"]
+
+        self.columns = {}
+        for column, dtype in COLUMNS.items():
+            length = self.rows + 1 if column.endswith("_offsets") else self.rows
+            self.columns[column] = self._map(f"{column}.bin", dtype, length)
+        self.id_blob = self._map("ids.bin", np.uint8, None)
+        self.allele_blob = self._map("alleles.bin", np.uint8, None)
+
+    def _map(self, name, dtype, length):
+        file_path = os.path.join(self.path, name)
+        if os.path.getsize(file_path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode="r", shape=length)
+
+    def filter_mask(self, filter_terms):
+        mask = 0
+        for filter_term in filter_terms:
+            needle = filter_term.lower()
+            mask |= sum(bit for term, bit in self.bits.items() if needle in term.lower())
+        return mask
+
+    def query(self, chromosome, start, end, filter_terms=None):
+        """
+        Row numbers of the variants overlapping chromosome:start-end, in position order,
+        optionally restricted to those matching any of filter_terms.
+        """
+        entry = self.chromosomes.get(normalize_chromosome(chromosome))
+        if entry is None:
+            return np.zeros(0, dtype=np.int64)
+        begin, stop, max_span = entry
+        start, end = int(start), int(end)
+
+        starts = self.columns["starts"][begin:stop]
+        low = np.searchsorted(starts, start - max_span, side="left")
+        high = np.searchsorted(starts, end, side="right")
+        rows = np.arange(begin + low, begin + high)
+        keep = self.columns["ends"][rows] >= start
+        if filter_terms is not None:
+            keep &= (self.columns["masks"][rows] & np.uint64(self.filter_mask(filter_terms))) != 0
+        return rows[keep]
+
+    def _string(self, blob, offsets, row):
+        return bytes(blob[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def record(self, row, chromosome):
+        """
+        Build one variant in the same shape as an Ensembl overlap record.
+        """
+        return {
+            "id": self._string(self.id_blob, self.columns["id_offsets"], row),
+            "seq_region_name": chromosome,
+            "start": int(self.columns["starts"][row]),
+            "end": int(self.columns["ends"][row]),
+            "allele_string": self._string(self.allele_blob, self.columns["allele_offsets"], row),
+            "consequence_type": self.consequence_pool[self.columns["consequences"][row]],
+        }
+
+    def iter_overlap(self, chromosome, start, end, filter_terms=None):
+        chromosome = normalize_chromosome(chromosome)
+        for row in self.query(chromosome, start, end, filter_terms):
+            yield self.record(int(row), chromosome)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_variant_index(path=None):
+    """
+    Return the loaded index at path (default VARIANTOR_VARIANT_INDEX), or None if
+    no local index is configured.
+    """
+    path = path or VARIANT_INDEX_PATH
+    if not path:
+        return None
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = VariantIndex(path)
+        return _indexes[path]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query a local variant index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build an index from a VCF or GFF3/GVF file")
+    build_parser.add_argument("source")
+    build_parser.add_argument("output_dir")
+
+    query_parser = subparsers.add_parser("query", help="Query an index by region, e.g. 17:43044295-43125483")
+    query_parser.add_argument("index_dir")
+    query_parser.add_argument("region")
+    query_parser.add_argument("--consequence", action="append")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        started = time.perf_counter()
+        meta = build_index(args.source, args.output_dir)
+        print(f"Indexed {meta['rows']} variants on {len(meta['chromosomes'])} chromosome(s) "
+              f"in {time.perf_counter() - started:.1f}s")
+    else:
+        index = VariantIndex(args.index_dir)
+        chromosome, span = args.region.split(":")
+        start, end = span.replace(",", "").split("-")
+        started = time.perf_counter()
+        rows = index.query(chromosome, start, end, args.consequence)
+        elapsed = time.perf_counter() - started
+        for row in rows:
+            print(json.dumps(index.record(int(row), normalize_chromosome(chromosome))))
+        print(f"{len(rows)} variant(s) in {elapsed * 1000:.3f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
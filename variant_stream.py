@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import codecs
+import tracemalloc
+import requests
+from api_cache import get_cache
+from http_session import http_get
+from metrics import record
+
+
+STREAM_VARIANTS = os.getenv("VARIANTOR_STREAM_VARIANTS", "").lower() in ("1", "true", "yes")
+VARIANT_REGION_SIZE = int(os.getenv("VARIANTOR_VARIANT_REGION_SIZE", "0"))
+TRACE_MEMORY = os.getenv("VARIANTOR_TRACE_MEMORY", "").lower() in ("1", "true", "yes")
+STREAM_CACHE_LIMIT = int(os.getenv("VARIANTOR_STREAM_CACHE_MAX_MB", "8")) * 1024 * 1024
+STREAM_CACHE_FILL = os.getenv("VARIANTOR_STREAM_CACHE_FILL", "").lower() in ("1", "true", "yes")
+CHUNK_SIZE = 64 * 1024
+
+OVERLAP_REGION_URL = "https://rest.ensembl.org/overlap/region/human/{chromosome}:{start}-{end}?feature=variation;content-type=application/json"
+
+
+class VariantFetchStats:
+    """
+    Timing and memory figures for one variant fetch. Peak memory is only traced
+    when VARIANTOR_TRACE_MEMORY is set, since tracemalloc slows everything down.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.time_to_first_result = None
+        self.elapsed = None
+        self.bytes_read = 0
+        self.requests = 0
+        self.cached_windows = 0
+        self.peak_memory = None
+        self._tracing = TRACE_MEMORY and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+    def mark_first_result(self):
+        if self.time_to_first_result is None:
+            self.time_to_first_result = time.perf_counter() - self.started
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        if self._tracing:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._tracing = False
+
+    def summary(self):
+        first = f"{self.time_to_first_result:.3f}s" if self.time_to_first_result is not None else "n/a"
+        peak = f"{self.peak_memory / 1e6:.1f} MB" if self.peak_memory is not None else "not traced"
+        return (
+            f"{self.elapsed:.3f}s total, first result after {first}, {self.bytes_read / 1e6:.2f} MB read "
+            f"in {self.requests} request(s), {self.cached_windows} cached window(s), peak memory {peak}"
+        )
+
+
+def iter_json_array(chunks):
+    """
+    Incrementally parse a top-level JSON array from an iterable of bytes or str
+    chunks, yielding each element as soon as it is complete. Raises ValueError when
+    the chunks end before the closing bracket.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = text_decoder.decode(chunk)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break
+            yield item
+
+    raise ValueError("Truncated JSON array")
+
+
+def _text_chunks(text):
+    for i in range(0, len(text), CHUNK_SIZE):
+        yield text[i:i + CHUNK_SIZE]
+
+
+def _is_complete_array(text):
+    try:
+        return isinstance(json.loads(text), list)
+    except ValueError:
+        return False
+
+
+def _iter_response(response, url, stats, cache):
+    """
+    Yield variants from a streamed response. The raw body is kept (up to
+    STREAM_CACHE_LIMIT) and cached only once it has been read to the closing
+    bracket without an error. When the consumer stops early the connection is
+    closed without reading the rest, unless VARIANTOR_STREAM_CACHE_FILL is set, in
+    which case the rest of the body is drained into the cache while it stays under
+    the limit.
+    """
+    chunk_iter = response.iter_content(CHUNK_SIZE)
+    raw = []
+    state = {"size": 0, "cacheable": True}
+
+    def keep(chunk):
+        stats.bytes_read += len(chunk)
+        record(bytes=len(chunk))
+        if state["cacheable"]:
+            raw.append(chunk)
+            state["size"] += len(chunk)
+            if state["size"] > STREAM_CACHE_LIMIT:
+                raw.clear()
+                state["cacheable"] = False
+
+    def chunks():
+        for chunk in chunk_iter:
+            keep(chunk)
+            yield chunk
+
+    completed = False
+    try:
+        yield from iter_json_array(chunks())
+        completed = True
+    finally:
+        try:
+            if state["cacheable"] and (completed or STREAM_CACHE_FILL):
+                for chunk in chunk_iter:
+                    keep(chunk)
+                    if not state["cacheable"]:
+                        break
+                if state["cacheable"]:
+                    body = b"".join(raw).decode("utf-8")
+                    # A drained body was never parsed, so it is checked before it is cached.
+                    if completed or _is_complete_array(body):
+                        cache.set("ensembl_overlap", {"url": url, "params": None}, body)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Not caching {url}: {e}")
+        finally:
+            response.close()
+
+
+def _open_window(url, stats, cache, offline=None):
+    """
+    Open one overlap query, from the cache when possible. Returns an iterator of
+    variants, or None when the request fails.
+    """
+    offline = cache.offline if offline is None else offline
+    cached = cache.get("ensembl_overlap", {"url": url, "params": None}, allow_stale=offline)
+    if cached is not None:
+        stats.cached_windows += 1
+        return iter_json_array(_text_chunks(cached))
+
+    if offline:
+        print(f"Offline mode: no cached response for {url}")
+        return None
+
+    try:
+        response = http_get(url, stream=True)
+    except requests.RequestException as e:
+        print(f"Error fetching {url}: {e}")
+        return None
+    stats.requests += 1
+    if response.status_code != 200:
+        print(f"Error fetching {url}, status code: {response.status_code}")
+        response.close()
+        return None
+    return _iter_response(response, url, stats, cache)
+
+
+def open_region(chromosome, start, end, stats, offline=None):
+    """
+    Stream the variants overlapping one region, cached like any other overlap query.
+    Returns an iterator of variant records, or None when the request fails.
+    """
+    url = OVERLAP_REGION_URL.format(chromosome=chromosome, start=start, end=end)
+    return _open_window(url, stats, get_cache(), offline)
+
+
+def region_urls(gene_info, region_size):
+    """
+    Split the gene span into overlap/region queries of at most region_size bases.
+    """
+    start, end = int(gene_info["Start"]), int(gene_info["End"])
+    urls = []
+    for window_start in range(start, end + 1, region_size):
+        window_end = min(window_start + region_size - 1, end)
+        urls.append(OVERLAP_REGION_URL.format(
+            chromosome=gene_info["Chromosome"], start=window_start, end=window_end
+        ))
+    return urls
+
+
+def open_variant_stream(url, gene_info, stats, region_size=VARIANT_REGION_SIZE, offline=None):
+    """
+    Stream the variants overlapping a gene. With region_size set, the gene span is
+    queried in sub-regions one after another so the whole locus is never held at once.
+    Returns an iterator of variant records, or None if the first query fails. If a
+    later sub-region fails to open, the iterator raises requests.RequestException
+    rather than ending early, so a partial result is never mistaken for a full one.
+    """
+    cache = get_cache()
+    urls = region_urls(gene_info, region_size) if region_size else [url]
+
+    first = _open_window(urls[0], stats, cache, offline)
+    if first is None:
+        return None
+
+    def variants():
+        yield from first
+        for window_url in urls[1:]:
+            window = _open_window(window_url, stats, cache, offline)
+            if window is None:
+                raise requests.RequestException(f"Could not open {window_url}")
+            yield from window
+
+    return variants()
@@ -0,0 +1,225 @@
+import threading
+from collections.abc import Sequence
+import numpy as np
+
+
+SO_TERMS = [
+    "transcript_ablation", "splice_acceptor_variant", "splice_donor_variant", "stop_gained",
+    "frameshift_variant", "stop_lost", "start_lost", "transcript_amplification", "feature_elongation",
+    "feature_truncation", "inframe_insertion", "inframe_deletion", "missense_variant", "protein_altering_variant",
+    "splice_donor_5th_base_variant", "splice_region_variant", "splice_donor_region_variant",
+    "splice_polypyrimidine_tract_variant", "incomplete_terminal_codon_variant", "start_retained_variant",
+    "stop_retained_variant", "synonymous_variant", "coding_sequence_variant", "mature_miRNA_variant", "5_prime_UTR_variant",
+    "3_prime_UTR_variant", "non_coding_transcript_exon_variant", "intron_variant", "NMD_transcript_variant",
+    "non_coding_transcript_variant", "coding_transcript_variant", "upstream_gene_variant", "downstream_gene_variant",
+    "TFBS_ablation", "TFBS_amplification", "TF_binding_site_variant", "regulatory_region_ablation",
+    "regulatory_region_amplification", "regulatory_region_variant", "intergenic_variant"
+]
+
+MAX_TERMS = 64
+
+
+class ConsequenceIndex:
+    """
+    Assigns every consequence term one bit of a 64-bit mask, starting with the SO
+    terms above. Terms Ensembl returns that are not in the list are registered on
+    first sight; past 64 terms new ones no longer get a bit.
+    """
+
+    def __init__(self, terms=SO_TERMS):
+        self.terms = []
+        self.bits = {}
+        self._masks = {}
+        self._lock = threading.Lock()
+        for term in terms:
+            self._register(term)
+
+    def _register(self, term):
+        if len(self.terms) >= MAX_TERMS:
+            return 0
+        bit = 1 << len(self.terms)
+        self.terms.append(term)
+        self.bits[term] = bit
+        return bit
+
+    def mask(self, consequences):
+        key = tuple(consequences)
+        mask = self._masks.get(key)
+        if mask is None:
+            with self._lock:
+                mask = 0
+                for term in key:
+                    bit = self.bits.get(term)
+                    if bit is None:
+                        bit = self._register(term)
+                    mask |= bit
+                self._masks[key] = mask
+        return mask
+
+    def filter_mask(self, filter_term):
+        """
+        Mask of every known term the filter matches, using the same case-insensitive
+        substring rule as the original filter loop.
+        """
+        needle = filter_term.lower()
+        with self._lock:
+            return sum(bit for term, bit in self.bits.items() if needle in term.lower())
+
+
+CONSEQUENCES = ConsequenceIndex()
+
+
+class ConsequenceMatcher:
+    """
+    Compiled form of a list of consequence filters. Each distinct consequence list is
+    matched against the filters once and memoized, so scanning a gene costs one dict
+    lookup per variant instead of a substring scan per filter and consequence.
+    """
+
+    def __init__(self, filters, index=CONSEQUENCES):
+        self.index = index
+        self.filters = list(filters)
+        self._lowered = [f.lower() for f in self.filters]
+        self._memo = {}
+
+    def match(self, consequences):
+        """
+        Return (mask, hits): the consequence bitmask and the positions of the filters it matches.
+        """
+        key = tuple(consequences)
+        result = self._memo.get(key)
+        if result is None:
+            lowered = [c.lower() for c in key]
+            hits = tuple(i for i, f in enumerate(self._lowered) if any(f in c for c in lowered))
+            result = (self.index.mask(key), hits)
+            self._memo[key] = result
+        return result
+
+
+class VariantTable:
+    """
+    Columnar store for variant records: ids, region, start/end, alleles and a
+    consequence bitmask per variant. Consequence strings are pooled and stored as
+    integer codes. Rows are appended to lists and converted to NumPy arrays on demand.
+    """
+
+    def __init__(self, index=CONSEQUENCES):
+        self.index = index
+        self._ids = []
+        self._regions = []
+        self._starts = []
+        self._ends = []
+        self._alleles = []
+        self._consequence_codes = []
+        self._masks = []
+        self.consequence_pool = []
+        self._pool_codes = {}
+        self._arrays = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def append(self, record, mask=None):
+        consequence_type = record.get("consequence_type", [])
+        if isinstance(consequence_type, str):
+            consequence_type = [consequence_type]
+        if mask is None:
+            mask = self.index.mask(consequence_type)
+
+        allele_string = record.get("allele_string", "N/A")
+        if allele_string == "N/A":
+            allele_string = record.get("alleles", "N/A")
+        if isinstance(allele_string, list):
+            allele_string = '/'.join(allele_string)
+
+        consequence = '/'.join(consequence_type)
+        code = self._pool_codes.get(consequence)
+        if code is None:
+            code = len(self.consequence_pool)
+            self.consequence_pool.append(consequence)
+            self._pool_codes[consequence] = code
+
+        self._ids.append(record.get("id", "N/A"))
+        self._regions.append(str(record.get("seq_region_name", "N/A")))
+        self._starts.append(record.get("start") or 0)
+        self._ends.append(record.get("end") or 0)
+        self._alleles.append(allele_string)
+        self._consequence_codes.append(code)
+        self._masks.append(mask)
+        self._arrays = None
+
+    def arrays(self):
+        if self._arrays is None:
+            self._arrays = {
+                "ids": np.array(self._ids, dtype=object),
+                "regions": np.array(self._regions, dtype=object),
+                "starts": np.array(self._starts, dtype=np.int64),
+                "ends": np.array(self._ends, dtype=np.int64),
+                "alleles": np.array(self._alleles, dtype=object),
+                "consequences": np.array(self._consequence_codes, dtype=np.int32),
+                "masks": np.array(self._masks, dtype=np.uint64),
+            }
+        return self._arrays
+
+    def first_occurrences(self):
+        """
+        Indices of the first row for every distinct variant id, in original order.
+        """
+        if not len(self):
+            return np.array([], dtype=np.intp)
+        _, first = np.unique(self.arrays()["ids"], return_index=True)
+        first.sort()
+        return first
+
+    def select_per_filter(self, filters, limit):
+        """
+        Select the first `limit` distinct variants matching each filter. A variant
+        matching several filters is returned once. Returns (indices, counts per filter).
+        """
+        masks = self.arrays()["masks"]
+        unique = self.first_occurrences()
+        unique_masks = masks[unique]
+        selected = np.zeros(len(unique), dtype=bool)
+        counts = {}
+        for filter_term in filters:
+            hits = np.flatnonzero(unique_masks & np.uint64(self.index.filter_mask(filter_term)))[:limit]
+            selected[hits] = True
+            counts[filter_term] = len(hits)
+        return unique[selected], counts
+
+    def view(self, indices=None):
+        if indices is None:
+            indices = np.arange(len(self))
+        return VariantView(self, indices)
+
+
+class VariantView(Sequence):
+    """
+    Read-only list-of-dicts view over selected rows of a VariantTable, in the
+    format the report and the chatbot context expect.
+    """
+
+    def __init__(self, table, indices):
+        self.table = table
+        self.indices = np.asarray(indices, dtype=np.intp)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return VariantView(self.table, self.indices[i])
+        row = int(self.indices[i])
+        table = self.table
+        return {
+            "Variation": table._ids[row],
+            "Location": table._regions[row],
+            "Allele": table._alleles[row],
+            "Consequence": table.consequence_pool[table._consequence_codes[row]],
+        }
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))